@@ -3,95 +3,147 @@ from datetime import datetime
 import os
 from pathlib import Path
 import pandas as pd
-from sklearn.ensemble import RandomForestClassifier
-import joblib
+from threading import Lock
 from services.training_service import TrainingService
+from services.training_jobs import get_training_queue
+from services.model_registry import model_registry
+
+DEFAULT_GRID_RESOLUTION = 10
+MAX_GRID_RESOLUTION = 500
+
+class ModelNotReadyError(RuntimeError):
+    """No trained model is published yet; a training job has been queued"""
+    def __init__(self, job):
+        super().__init__(f"Model is not trained yet (training job {job['id']} is {job['status']})")
+        self.job = job
 
 class GamePredictor:
     def __init__(self, db_session=None):
         self.model = None
+        self.model_path = Path('data') / 'model.pkl'
         self.training_service = TrainingService()
         self.feature_columns = [
             'elevation', 'slope', 'forest_density', 'water_distance',
             'temperature', 'precipitation', 'wind_speed'
         ]
+        # Weather used for hotspot scoring until live weather is wired in
+        self.default_weather = {
+            'temperature': 15.0,
+            'precipitation': 0.0,
+            'wind_speed': 5.0
+        }
         self.initialize_model()
 
     def initialize_model(self):
-        """Initialize and train the model for game prediction"""
-        self.model = RandomForestClassifier(
-            n_estimators=100,
-            max_depth=10,
-            random_state=42
-        )
-        
-        # Create data directory if it doesn't exist
-        data_dir = Path('data')
-        data_dir.mkdir(exist_ok=True)
-        model_path = data_dir / 'model.pkl'
+        """Load the published model, queueing a training job if there is none
         
-        # Train the model if no saved weights exist
-        if not model_path.exists():
-            self.train_model()
+        Training never runs in the serving process; until the job publishes
+        a model, predictions raise ModelNotReadyError.
+        """
+        if self.model_path.exists():
+            self.model = model_registry.get(self.model_path)
         else:
-            self.model = joblib.load(model_path)
+            self.train_model()
 
-    def train_model(self):
-        """Train the model using synthetic data"""
-        # Generate synthetic data for training
-        gmu_id = '28'  # Example GMU
-        n_samples = 1000
-        data = self.training_service.generate_synthetic_data(gmu_id, n_samples)
+    def train_model(self, gmu_id: str = '28', n_samples: int = 1000):
+        """Queue a background job that trains and publishes a new model
         
-        # Prepare features and target
-        X = data[self.feature_columns]
-        y = data['animal_present']
-        
-        # Train the model
-        self.model.fit(X, y)
-        
-        # Save the trained model
-        model_path = Path('data') / 'model.pkl'
-        joblib.dump(self.model, model_path)
+        Returns the job record; if a job is already queued or running, that
+        job is returned instead.
+        """
+        return get_training_queue().submit({
+            'gmu_id': gmu_id,
+            'n_samples': n_samples,
+            'feature_columns': self.feature_columns,
+            'target': 'animal_present',
+            'model_params': {
+                'n_estimators': 100,
+                'max_depth': 10,
+                'random_state': 42
+            }
+        })
+
+    def _current_model(self):
+        """Get the latest published model, picking up on-disk updates"""
+        try:
+            self.model = model_registry.get(self.model_path)
+        except FileNotFoundError:
+            if self.model is None:
+                raise ModelNotReadyError(self.train_model())
+        return self.model
 
     def predict(self, features):
         """Make predictions using the trained model"""
-        if self.model is None:
-            self.initialize_model()
+        model = self._current_model()
             
         # Ensure features match expected columns
         X = pd.DataFrame([features])[self.feature_columns]
-        return self.model.predict_proba(X)[0][1]  # Return probability of presence
+        return model.predict_proba(X)[0][1]  # Return probability of presence
+
+    def predict_batch(self, X: np.ndarray) -> np.ndarray:
+        """Return presence probabilities for a feature matrix in a single call
+        
+        Rows of X must follow the order of self.feature_columns.
+        """
+        model = self._current_model()
+            
+        X = pd.DataFrame(X, columns=self.feature_columns, copy=False)
+        return model.predict_proba(X)[:, 1]
 
-    def get_hotspots(self, bounds):
-        """Get hunting hotspots within the given bounds"""
+    def get_hotspots(self, bounds, resolution: int = DEFAULT_GRID_RESOLUTION,
+                     threshold: float = 0.5):
+        """Get hunting hotspots within the given bounds
+        
+        The whole resolution x resolution grid is featurized as one array and
+        scored with a single predict_proba call.
+        """
+        if not 1 <= resolution <= MAX_GRID_RESOLUTION:
+            raise ValueError(
+                f"resolution must be between 1 and {MAX_GRID_RESOLUTION}"
+            )
+            
         # Generate a grid of points within the bounds
-        lat_points = np.linspace(bounds['south'], bounds['north'], 10)
-        lon_points = np.linspace(bounds['west'], bounds['east'], 10)
+        lat_points = np.linspace(bounds['south'], bounds['north'], resolution)
+        lon_points = np.linspace(bounds['west'], bounds['east'], resolution)
+        lat_grid, lon_grid = np.meshgrid(lat_points, lon_points, indexing='ij')
+        lats = lat_grid.ravel()
+        lons = lon_grid.ravel()
+        
+        # Terrain for every cell, plus default weather broadcast over the grid
+        terrain = self.training_service.terrain_service.get_terrain_features_batch(lats, lons)
+        columns = dict(terrain)
+        for name, value in self.default_weather.items():
+            columns[name] = np.full(lats.size, value)
+        X = np.column_stack([columns[name] for name in self.feature_columns])
         
-        hotspots = []
-        for lat in lat_points:
-            for lon in lon_points:
-                # Get terrain features from the training service
-                terrain = self.training_service.terrain_service.get_terrain_features(lat, lon)
-                
-                # Add weather features (using defaults for now)
-                features = {
-                    **terrain,
-                    'temperature': 15.0,  # Default temperature
-                    'precipitation': 0.0,  # Default precipitation
-                    'wind_speed': 5.0,    # Default wind speed
-                }
-                
-                # Get prediction for this location
-                probability = self.predict(features)
-                
-                if probability > 0.5:  # Only include likely spots
-                    hotspots.append({
-                        'lat': lat,
-                        'lon': lon,
-                        'probability': probability,
-                        'terrain': terrain
-                    })
+        probabilities = self.predict_batch(X)
         
-        return sorted(hotspots, key=lambda x: x['probability'], reverse=True)
+        # Only include likely spots, best first
+        likely = np.flatnonzero(probabilities > threshold)
+        likely = likely[np.argsort(-probabilities[likely], kind='stable')]
+        
+        return [
+            {
+                'lat': float(lats[i]),
+                'lon': float(lons[i]),
+                'probability': float(probabilities[i]),
+                'terrain': {name: float(values[i]) for name, values in terrain.items()}
+            }
+            for i in likely
+        ]
+
+_predictor = None
+_predictor_lock = Lock()
+
+def get_game_predictor() -> GamePredictor:
+    """Get the worker's shared GamePredictor, creating it on first use
+    
+    The predictor holds no per-request state, and its model comes from the
+    process-wide registry, so one instance serves every request.
+    """
+    global _predictor
+    if _predictor is None:
+        with _predictor_lock:
+            if _predictor is None:
+                _predictor = GamePredictor()
+    return _predictor
@@ -8,6 +8,9 @@ from flask_login import UserMixin, login_required, current_user, LoginManager
 from datetime import datetime
 from pathlib import Path
 import ai_predictor
+from services.training_jobs import get_training_queue
+from services.cache import cache_stats
+from routes.ml_routes import ml_blueprint
 from . import db, create_app, login_manager
 
 # Load environment variables
@@ -38,6 +41,8 @@ socketio = SocketIO(app, cors_allowed_origins=[
     "http://localhost:3000"
 ])
 
+app.register_blueprint(ml_blueprint)
+
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
@@ -83,15 +88,31 @@ def get_predictions():
             'east': float(request.args.get('east', -105.75)),
             'west': float(request.args.get('west', -106.25))
         }
+        resolution = int(request.args.get(
+            'resolution', ai_predictor.DEFAULT_GRID_RESOLUTION
+        ))
         
         # Get predictions
-        predictions = ai_predictor.GamePredictor().get_hotspots(bounds)
+        predictions = ai_predictor.get_game_predictor().get_hotspots(bounds, resolution)
         
         return jsonify({
             'status': 'success',
             'predictions': predictions
         })
         
+    except ai_predictor.ModelNotReadyError as e:
+        response = jsonify({
+            'status': 'error',
+            'message': str(e),
+            'job': e.job
+        })
+        response.headers['Retry-After'] = '30'
+        return response, 503
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
     except Exception as e:
         logger.error(f"Error in get_predictions: {str(e)}")
         return jsonify({
@@ -99,6 +120,54 @@ def get_predictions():
             'message': str(e)
         }), 500
 
+@app.route('/api/training/jobs', methods=['POST'])
+@login_required
+def create_training_job():
+    try:
+        data = request.get_json(silent=True) or {}
+        job = ai_predictor.get_game_predictor().train_model(
+            gmu_id=str(data.get('gmu_id', '28')),
+            n_samples=int(data.get('n_samples', 1000))
+        )
+        return jsonify({
+            'status': 'success',
+            'job': job
+        }), 202
+        
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        logger.error(f"Error in create_training_job: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@app.route('/api/training/jobs/<job_id>', methods=['GET'])
+@login_required
+def get_training_job(job_id):
+    job = get_training_queue().get_job(job_id)
+    if job is None:
+        return jsonify({
+            'status': 'error',
+            'message': 'Training job not found'
+        }), 404
+    return jsonify({
+        'status': 'success',
+        'job': job
+    })
+
+@app.route('/api/cache/stats', methods=['GET'])
+@login_required
+def get_cache_stats():
+    return jsonify({
+        'status': 'success',
+        'caches': cache_stats()
+    })
+
 @app.route('/api/hunts', methods=['POST'])
 @login_required
 def record_hunt():
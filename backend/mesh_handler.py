@@ -1,28 +1,257 @@
 import meshtastic
 import meshtastic.serial_interface
+import os
 import json
 import time
+from collections import deque
 from datetime import datetime
-from threading import Thread, Lock
-import queue
+from threading import Condition, Thread, Lock
 import logging
+from mesh_writer import MeshWriteBuffer, SQLAlchemyMeshWriter
+from mesh_tracks import TrackStore
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Recent latencies kept per message type for percentiles
+LATENCY_WINDOW = 1024
+
+# Most messages held per type; when a lane is full its oldest message is
+# dropped. Emergencies are never dropped. Location and status lanes keep
+# every message until their depth reaches COALESCE_AFTER; past that backlog
+# a node's new message replaces its pending one, so the track store only
+# sees the newest fix of a node while the workers are behind.
+DEFAULT_QUEUE_LIMITS = {
+    'location': 10000,
+    'status': 10000,
+    'text': 1000
+}
+COALESCE_AFTER = {
+    'location': 1000,
+    'status': 1000
+}
+
+class _TypeStats:
+    """Processing counters and recent latencies for one message type"""
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.handle_seconds = deque(maxlen=LATENCY_WINDOW)
+        self.queue_seconds = deque(maxlen=LATENCY_WINDOW)
+
+    def record(self, queue_seconds, handle_seconds, ok):
+        self.count += 1
+        self.errors += 0 if ok else 1
+        self.total_seconds += handle_seconds
+        self.max_seconds = max(self.max_seconds, handle_seconds)
+        self.handle_seconds.append(handle_seconds)
+        self.queue_seconds.append(queue_seconds)
+
+    def summary(self):
+        def percentile_ms(values, q):
+            if not values:
+                return None
+            ordered = sorted(values)
+            return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'avg_ms': self.total_seconds / self.count * 1000 if self.count else None,
+            'max_ms': self.max_seconds * 1000,
+            'p50_ms': percentile_ms(self.handle_seconds, 0.5),
+            'p95_ms': percentile_ms(self.handle_seconds, 0.95),
+            'queue_p50_ms': percentile_ms(self.queue_seconds, 0.5),
+            'queue_p95_ms': percentile_ms(self.queue_seconds, 0.95)
+        }
+
+class _Lane:
+    """Bounded FIFO for one message type that drops its oldest message when full"""
+    def __init__(self, limit=None):
+        self.limit = limit
+        self.items = deque()
+        self.dropped = 0
+        self.coalesced = 0
+
+    def __len__(self):
+        return len(self.items)
+
+    def put(self, seq, message):
+        if self.limit is not None and len(self.items) >= self.limit:
+            self.items.popleft()
+            self.dropped += 1
+        self.items.append((seq, message))
+
+    def head_seq(self):
+        return self.items[0][0]
+
+    def pop(self):
+        return self.items.popleft()[1]
+
+class _CoalescingLane(_Lane):
+    """Lane that, once backlog messages are waiting, replaces a node's
+    pending message with its newer one in the same queue slot"""
+    def __init__(self, limit=None, backlog=0):
+        super().__init__(limit)
+        self.backlog = backlog
+        # Each node's newest queued entry, as the [seq, message] list in items
+        self.pending = {}
+
+    def put(self, seq, message):
+        key = message['from_id']
+        entry = self.pending.get(key)
+        if entry is not None and len(self.items) >= self.backlog:
+            entry[1] = message
+            self.coalesced += 1
+            return
+        if self.limit is not None and len(self.items) >= self.limit:
+            self._forget(self.items.popleft())
+            self.dropped += 1
+        entry = [seq, message]
+        self.items.append(entry)
+        self.pending[key] = entry
+
+    def pop(self):
+        entry = self.items.popleft()
+        self._forget(entry)
+        return entry[1]
+
+    def _forget(self, entry):
+        key = entry[1]['from_id']
+        if self.pending.get(key) is entry:
+            del self.pending[key]
+
+class _IngestQueue:
+    """Per-type message lanes with a priority lane for emergencies.
+
+    Emergencies wait on their own condition and never queue behind other
+    traffic. The other lanes are bounded and handed out across types in
+    arrival order. Closing lets consumers finish what is queued and then
+    receive an empty result.
+    """
+    def __init__(self, limits):
+        self.limits = limits
+        self.lock = Lock()
+        self.ready = Condition(self.lock)
+        self.urgent = Condition(self.lock)
+        self.emergencies = _Lane()
+        self.lanes = {}
+        self.closed = False
+        self._seq = 0
+
+    def _lane(self, message_type):
+        lane = self.lanes.get(message_type)
+        if lane is None:
+            limit = self.limits.get(message_type, self.limits.get('text'))
+            if message_type in COALESCE_AFTER:
+                lane = _CoalescingLane(limit, COALESCE_AFTER[message_type])
+            else:
+                lane = _Lane(limit)
+            self.lanes[message_type] = lane
+        return lane
+
+    def put(self, message):
+        with self.lock:
+            self._seq += 1
+            if message['type'] == 'emergency':
+                self.emergencies.put(self._seq, message)
+                self.urgent.notify()
+                # Wake a general worker too, in case the emergency worker is busy
+                self.ready.notify()
+            else:
+                self._lane(message['type']).put(self._seq, message)
+                self.ready.notify()
+
+    def get_emergency(self, block=True):
+        """Next emergency, or None when there is none (and, if blocking, the queue is closed)"""
+        with self.lock:
+            while not self.emergencies:
+                if not block or self.closed:
+                    return None
+                self.urgent.wait()
+            return self.emergencies.pop()
+
+    def get_batch(self, size):
+        """Block for up to size messages, oldest first across types, emergencies
+        ahead of all; empty once closed and drained"""
+        with self.lock:
+            while not self.closed and not self.emergencies and not any(self.lanes.values()):
+                self.ready.wait()
+            batch = []
+            while self.emergencies and len(batch) < size:
+                batch.append(self.emergencies.pop())
+            while len(batch) < size:
+                lanes = [lane for lane in self.lanes.values() if lane]
+                if not lanes:
+                    break
+                batch.append(min(lanes, key=lambda lane: lane.head_seq()).pop())
+            return batch
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+            self.ready.notify_all()
+            self.urgent.notify_all()
+
+    def open(self):
+        with self.lock:
+            self.closed = False
+
+    def qsize(self):
+        with self.lock:
+            return len(self.emergencies) + sum(len(lane) for lane in self.lanes.values())
+
+    def get_stats(self):
+        with self.lock:
+            lanes = dict(self.lanes, emergency=self.emergencies)
+            return {
+                message_type: {
+                    'depth': len(lane),
+                    'limit': lane.limit,
+                    'dropped': lane.dropped,
+                    'coalesced': lane.coalesced
+                }
+                for message_type, lane in lanes.items()
+            }
+
 class MeshHandler:
-    def __init__(self, db):
+    def __init__(self, db, workers=None, batch_size=None, writer=None, app=None,
+                 queue_limits=None, emergency_slo_ms=None):
         self.db = db
         self.interface = None
         self.connected = False
-        self.message_queue = queue.Queue()
+        self.message_queue = _IngestQueue({**DEFAULT_QUEUE_LIMITS, **(queue_limits or {})})
+        # Receipt to rebroadcast; slower emergencies are logged as breaches
+        self.emergency_slo_ms = emergency_slo_ms or float(os.getenv('MESH_EMERGENCY_SLO_MS', 1000))
+        self.emergency_breaches = 0
         self.nodes = {}
         self.node_lock = Lock()
+        self.workers = workers or int(os.getenv('MESH_WORKERS', 1))
+        self.batch_size = batch_size or int(os.getenv('MESH_BATCH_SIZE', 64))
+        self.handlers = {
+            'location': self._handle_location_update,
+            'status': self._handle_status_update,
+            'text': self._handle_text_message,
+            'emergency': self._handle_emergency
+        }
+        self._threads = []
+        self._emergency_thread = None
+        self._stats = {}
+        self._stats_lock = Lock()
+        # Database writes are buffered and flushed in bulk
+        self.write_buffer = MeshWriteBuffer(writer or SQLAlchemyMeshWriter(db, app=app))
+        # Position history for track replay and proximity queries
+        self.tracks = TrackStore()
         
-    def connect(self, port=None):
-        """Connect to the Meshtastic device"""
+    def connect(self, port=None, interface=None):
+        """Connect to the Meshtastic device, or use an already open interface"""
         try:
-            if port:
+            if interface is not None:
+                # e.g. mesh_simulator.SimulatedInterface for load tests
+                self.interface = interface
+            elif port:
                 self.interface = meshtastic.serial_interface.SerialInterface(port)
             else:
                 self.interface = meshtastic.serial_interface.SerialInterface()
@@ -32,8 +261,8 @@ class MeshHandler:
             self.interface.onConnection = self.on_connection
             self.interface.onNode = self.on_node
             
-            # Start message processing thread
-            Thread(target=self._process_messages, daemon=True).start()
+            # Start message processing threads
+            self.start()
             
             logger.info("Successfully connected to Meshtastic device")
             return True
@@ -63,7 +292,8 @@ class MeshHandler:
                 'from_id': from_id,
                 'type': message_type,
                 'data': data,
-                'timestamp': datetime.utcnow()
+                'timestamp': datetime.utcnow(),
+                'enqueued_at': time.monotonic()
             })
             
         except Exception as e:
@@ -84,111 +314,185 @@ class MeshHandler:
                 'last_seen': datetime.utcnow()
             }
 
+    def start(self):
+        """Start the emergency worker and the worker threads that dispatch queued messages"""
+        self.write_buffer.start()
+        self.message_queue.open()
+        if self._emergency_thread is None or not self._emergency_thread.is_alive():
+            self._emergency_thread = Thread(target=self._process_emergencies, daemon=True)
+            self._emergency_thread.start()
+        self._threads = [t for t in self._threads if t.is_alive()]
+        for _ in range(self.workers - len(self._threads)):
+            thread = Thread(target=self._process_messages, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=None):
+        """Stop the workers once the messages queued before this call are handled"""
+        threads, self._threads = self._threads, []
+        if self._emergency_thread is not None:
+            threads.append(self._emergency_thread)
+            self._emergency_thread = None
+        self.message_queue.close()
+        for thread in threads:
+            thread.join(timeout)
+        self.write_buffer.stop()
+
+    def _process_emergencies(self):
+        """Emergency worker: handles emergencies as they arrive, never behind other traffic"""
+        while True:
+            message = self.message_queue.get_emergency()
+            if message is None:
+                return
+            self._dispatch(message)
+
     def _process_messages(self):
-        """Background thread to process received messages"""
+        """Worker loop: take a batch, checking for emergencies before each message"""
         while True:
-            try:
-                message = self.message_queue.get()
-                
-                if message['type'] == 'location':
-                    self._handle_location_update(message)
-                elif message['type'] == 'status':
-                    self._handle_status_update(message)
-                elif message['type'] == 'text':
-                    self._handle_text_message(message)
-                elif message['type'] == 'emergency':
-                    self._handle_emergency(message)
-                
-                self.message_queue.task_done()
-                
-            except Exception as e:
-                logger.error(f"Error processing message: {e}")
-            
-            time.sleep(0.1)  # Prevent CPU overuse
+            batch = self.message_queue.get_batch(self.batch_size)
+            if not batch:
+                return
+            for message in batch:
+                # Emergencies that arrived mid-batch go first
+                while True:
+                    emergency = self.message_queue.get_emergency(block=False)
+                    if emergency is None:
+                        break
+                    self._dispatch(emergency)
+                self._dispatch(message)
 
-    def _handle_location_update(self, message):
-        """Process location updates"""
+    def _dispatch(self, message):
+        """Route a message to the handler for its type and record its latency
+
+        Handlers raise on failure; the error is logged here and counted in
+        the type's stats.
+        """
+        handler = self.handlers.get(message['type'])
+        if handler is None:
+            logger.warning(f"No handler for message type {message['type']!r}")
+            return
+            
+        start = time.monotonic()
+        ok = True
         try:
-            from_id = message['from_id']
-            position = message['data'].get('position', {})
+            handler(message)
+        except Exception as e:
+            ok = False
+            logger.error(f"Error handling {message['type']} message from {message.get('from_id')}: {e}")
+        end = time.monotonic()
+        
+        queue_seconds = start - message.get('enqueued_at', start)
+        with self._stats_lock:
+            stats = self._stats.get(message['type'])
+            if stats is None:
+                stats = self._stats[message['type']] = _TypeStats()
+            stats.record(queue_seconds, end - start, ok)
             
+        if message['type'] == 'emergency':
+            total_ms = (end - message.get('enqueued_at', start)) * 1000
+            if total_ms > self.emergency_slo_ms:
+                with self._stats_lock:
+                    self.emergency_breaches += 1
+                logger.warning(
+                    f"Emergency from {message['from_id']} took {total_ms:.0f} ms, "
+                    f"over the {self.emergency_slo_ms:.0f} ms SLO"
+                )
+
+    def get_stats(self):
+        """Get queue depth, live workers and per-type processing latency"""
+        with self._stats_lock:
+            types = {name: stats.summary() for name, stats in self._stats.items()}
+            emergency_breaches = self.emergency_breaches
+        return {
+            'queue_depth': self.message_queue.qsize(),
+            'queues': self.message_queue.get_stats(),
+            'workers': sum(t.is_alive() for t in self._threads),
+            'types': types,
+            'emergency_slo': {
+                'slo_ms': self.emergency_slo_ms,
+                'breaches': emergency_breaches
+            },
+            'db_writes': self.write_buffer.get_stats(),
+            'tracks': self.tracks.get_stats()
+        }
+
+    def _record_position(self, from_id, position, timestamp, battery=None):
+        """Add a position fix to the node's track"""
+        lat = position.get('lat', position.get('latitude'))
+        lon = position.get('lon', position.get('longitude'))
+        if lat is None or lon is None:
+            return
+        if battery is None:
             with self.node_lock:
-                if from_id in self.nodes:
-                    self.nodes[from_id]['position'] = position
-                    self.nodes[from_id]['last_seen'] = message['timestamp']
-            
-            # Update database
-            from models import User
-            user = User.query.filter_by(mesh_id=from_id).first()
-            if user:
-                user.last_location = f"{position.get('lat', 0)},{position.get('lon', 0)}"
-                user.last_seen = message['timestamp']
-                self.db.session.commit()
-                
-        except Exception as e:
-            logger.error(f"Error handling location update: {e}")
+                battery = self.nodes.get(from_id, {}).get('battery')
+        self.tracks.append(
+            from_id, timestamp, lat, lon,
+            alt=position.get('alt', position.get('altitude')),
+            battery=battery
+        )
+
+    def _handle_location_update(self, message):
+        """Process location updates"""
+        from_id = message['from_id']
+        position = message['data'].get('position', {})
+        
+        with self.node_lock:
+            if from_id in self.nodes:
+                self.nodes[from_id]['position'] = position
+                self.nodes[from_id]['last_seen'] = message['timestamp']
+        
+        self._record_position(from_id, position, message['timestamp'])
+        
+        # Update database; only the newest position per node is written
+        self.write_buffer.add_location(from_id, position, message['timestamp'])
 
     def _handle_status_update(self, message):
         """Process status updates"""
-        try:
-            data = message['data']
-            from_id = message['from_id']
-            
-            with self.node_lock:
-                if from_id in self.nodes:
-                    self.nodes[from_id]['status'] = data.get('status', '')
-                    self.nodes[from_id]['battery'] = data.get('battery', 0)
-                    self.nodes[from_id]['last_seen'] = message['timestamp']
-            
-        except Exception as e:
-            logger.error(f"Error handling status update: {e}")
+        data = message['data']
+        from_id = message['from_id']
+        
+        with self.node_lock:
+            if from_id in self.nodes:
+                self.nodes[from_id]['status'] = data.get('status', '')
+                self.nodes[from_id]['battery'] = data.get('battery', 0)
+                self.nodes[from_id]['last_seen'] = message['timestamp']
+        
+        # Status reports may carry a fix along with the battery level
+        if data.get('position'):
+            self._record_position(from_id, data['position'], message['timestamp'],
+                                  battery=data.get('battery'))
 
     def _handle_text_message(self, message):
         """Process text messages"""
-        try:
-            from_id = message['from_id']
-            content = message['data'].get('content', '')
-            
-            # Store message in database
-            from models import Message
-            new_message = Message(
-                content=content,
-                sender_id=from_id,
-                timestamp=message['timestamp']
-            )
-            self.db.session.add(new_message)
-            self.db.session.commit()
-            
-        except Exception as e:
-            logger.error(f"Error handling text message: {e}")
+        from_id = message['from_id']
+        content = message['data'].get('content', '')
+        
+        # Store message in database with the next bulk insert
+        self.write_buffer.add_message(content, from_id, message['timestamp'])
 
     def _handle_emergency(self, message):
         """Process emergency alerts"""
-        try:
-            from_id = message['from_id']
-            alert_type = message['data'].get('alert_type', 'general')
-            position = message['data'].get('position', {})
-            
-            # Update node status
-            with self.node_lock:
-                if from_id in self.nodes:
-                    self.nodes[from_id]['emergency'] = {
-                        'type': alert_type,
-                        'position': position,
-                        'timestamp': message['timestamp']
-                    }
-            
-            # Broadcast emergency to all nodes
-            self.broadcast_message({
-                'type': 'emergency_broadcast',
-                'from_id': from_id,
-                'alert_type': alert_type,
-                'position': position,
-                'timestamp': message['timestamp'].isoformat()
-            })
-            
-        except Exception as e:
-            logger.error(f"Error handling emergency: {e}")
+        from_id = message['from_id']
+        alert_type = message['data'].get('alert_type', 'general')
+        position = message['data'].get('position', {})
+        
+        # Update node status
+        with self.node_lock:
+            if from_id in self.nodes:
+                self.nodes[from_id]['emergency'] = {
+                    'type': alert_type,
+                    'position': position,
+                    'timestamp': message['timestamp']
+                }
+        
+        # Broadcast emergency to all nodes
+        self.broadcast_message({
+            'type': 'emergency_broadcast',
+            'from_id': from_id,
+            'alert_type': alert_type,
+            'position': position,
+            'timestamp': message['timestamp'].isoformat()
+        })
 
     def broadcast_message(self, message):
         """Send message to all nodes"""
@@ -225,3 +529,12 @@ class MeshHandler:
         """Get specific node information"""
         with self.node_lock:
             return self.nodes.get(node_id)
+
+    def get_nearby_nodes(self, lat, lon, radius_km=2.0, window_seconds=600, exclude=None):
+        """Get nodes that reported within radius_km of a point in the last window_seconds"""
+        return self.tracks.nearby(lat, lon, radius_km, window_seconds=window_seconds,
+                                  exclude=exclude)
+
+    def get_node_track(self, node_id, start=None, end=None):
+        """Get a node's recorded positions in time order"""
+        return self.tracks.track(node_id, start=start, end=end)
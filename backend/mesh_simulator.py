@@ -0,0 +1,334 @@
+"""Offline mesh traffic for exercising MeshHandler without radios.
+
+Run as a script to benchmark the handler against a synthetic or recorded
+packet stream:
+
+    python mesh_simulator.py --nodes 200 --duration 30 --workers 4
+    python mesh_simulator.py --record traffic.jsonl --duration 60
+    python mesh_simulator.py --replay traffic.jsonl --speed 0
+"""
+import sys
+import json
+import time
+import argparse
+from threading import Event, Lock, Thread
+import numpy as np
+
+MESSAGE_TYPES = ('location', 'status', 'text', 'emergency')
+
+# Packets per second across all nodes
+DEFAULT_RATES = {
+    'location': 200.0,
+    'status': 20.0,
+    'text': 20.0,
+    'emergency': 0.5
+}
+
+# Simulated nodes get ids in the range real Meshtastic node numbers use
+NODE_BASE = 0x10000000
+
+TEXT_SAMPLES = [
+    'On the ridge, glassing the north slope',
+    'Elk moving toward the creek',
+    'Heading back to the truck',
+    'Anyone have eyes on the meadow?',
+    'Bugling below me, going quiet'
+]
+
+ALERT_TYPES = ['injury', 'lost', 'weather', 'general']
+
+def _percentile_ms(values, q):
+    if not len(values):
+        return None
+    return float(np.percentile(values, q) * 1000)
+
+def synthetic_packets(nodes=50, duration=10.0, rates=None, center=(39.5, -106.0),
+                      spread_km=5.0, seed=None):
+    """Generate a packet stream as (seconds from start, packet) pairs in time order
+
+    Each message type arrives as a Poisson process at its rate, from a
+    random node. Nodes start scattered around center and random-walk, so
+    location and emergency packets carry plausible positions.
+    """
+    rates = {**DEFAULT_RATES, **(rates or {})}
+    rng = np.random.default_rng(seed)
+
+    offsets, types = [], []
+    for message_type, rate in rates.items():
+        count = rng.poisson(rate * duration) if rate > 0 else 0
+        offsets.append(rng.uniform(0, duration, count))
+        types.append(np.full(count, message_type, dtype=object))
+    offsets = np.concatenate(offsets)
+    types = np.concatenate(types)
+    order = np.argsort(offsets, kind='stable')
+    offsets, types = offsets[order], types[order]
+    senders = rng.integers(0, nodes, len(offsets))
+
+    degrees = spread_km / 111.32
+    lats = center[0] + rng.uniform(-degrees, degrees, nodes)
+    lons = center[1] + rng.uniform(-degrees, degrees, nodes)
+    alts = rng.uniform(2500, 3500, nodes)
+    batteries = rng.uniform(40, 100, nodes)
+    # About 20 m per step
+    steps = rng.normal(0, 0.0002, (len(offsets), 2))
+
+    for i, (offset, message_type, node) in enumerate(zip(offsets, types, senders)):
+        position = {
+            'lat': round(float(lats[node]), 6),
+            'lon': round(float(lons[node]), 6),
+            'alt': round(float(alts[node]), 1)
+        }
+        if message_type == 'location':
+            lats[node] += steps[i, 0]
+            lons[node] += steps[i, 1]
+            text = json.dumps({'type': 'location', 'position': position})
+        elif message_type == 'status':
+            batteries[node] = max(0.0, batteries[node] - 0.1)
+            text = json.dumps({'type': 'status', 'status': 'ok',
+                               'battery': round(float(batteries[node]), 1)})
+        elif message_type == 'emergency':
+            text = json.dumps({'type': 'emergency', 'position': position,
+                               'alert_type': ALERT_TYPES[rng.integers(len(ALERT_TYPES))]})
+        else:
+            # Chatter is plain text, as typed on a radio
+            text = TEXT_SAMPLES[rng.integers(len(TEXT_SAMPLES))]
+        yield float(offset), {'from': NODE_BASE + int(node), 'decoded': {'text': text}}
+
+def save_recording(packets, path):
+    """Write (seconds, packet) pairs as JSON lines; returns the packet count"""
+    count = 0
+    with open(path, 'w') as f:
+        for offset, packet in packets:
+            f.write(json.dumps({'t': offset, 'packet': packet}) + '\n')
+            count += 1
+    return count
+
+def load_recording(path):
+    """Read a recording written by save_recording"""
+    packets = []
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                packets.append((record['t'], record['packet']))
+    return packets
+
+class SimulatedInterface:
+    """Stand-in for a Meshtastic serial interface that replays packets.
+
+    MeshHandler sets onReceive, onConnection and onNode on it just as on a
+    real interface. start() reports a node entry for every sender, then
+    delivers each packet to onReceive at its recorded offset divided by
+    speed; speed 0 delivers as fast as possible. Text sent through the
+    interface is kept in sent.
+    """
+
+    def __init__(self, packets, speed=1.0):
+        self.packets = list(packets)
+        self.speed = speed
+        self.onReceive = None
+        self.onConnection = None
+        self.onNode = None
+        self.sent = []
+        self.delivered = 0
+        self.replay_seconds = None
+        self._sent_lock = Lock()
+        self._done = Event()
+        self._stop = Event()
+        self._thread = None
+
+    def node_ids(self):
+        return sorted({packet['from'] for _, packet in self.packets})
+
+    def start(self):
+        """Start replaying on a background thread"""
+        self._done.clear()
+        self._stop.clear()
+        self._thread = Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def wait(self, timeout=None):
+        """Wait for the replay to finish; returns False on timeout"""
+        return self._done.wait(timeout)
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        try:
+            if self.onConnection:
+                self.onConnection(self, topic='simulated')
+            if self.onNode:
+                for node_id in self.node_ids():
+                    self.onNode({
+                        'num': node_id,
+                        'user': {'id': f'!{node_id:08x}', 'longName': f'Sim {node_id:08x}'}
+                    })
+
+            start = time.monotonic()
+            for offset, packet in self.packets:
+                if self._stop.is_set():
+                    break
+                if self.speed:
+                    delay = start + offset / self.speed - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                self.onReceive(packet, self)
+                self.delivered += 1
+            self.replay_seconds = time.monotonic() - start
+        finally:
+            self._done.set()
+
+    def sendText(self, text, destinationId=None):
+        with self._sent_lock:
+            self.sent.append({'text': text, 'destination': destinationId})
+
+class CountingWriter:
+    """Mesh DB writer that counts rows instead of writing them; latency
+    seconds of sleep per batch stand in for a database round trip"""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.batches = 0
+        self.locations = 0
+        self.messages = 0
+        self._lock = Lock()
+
+    def write(self, locations, messages):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.batches += 1
+            self.locations += len(locations)
+            self.messages += len(messages)
+
+def run_benchmark(packets, workers=None, batch_size=None, speed=0.0, db_latency=0.0):
+    """Replay packets through a MeshHandler and report throughput and latency
+
+    Queue latency is the time from on_receive queueing a message to a
+    worker starting its handler, measured for every message. Messages
+    coalesced or dropped by the handler's bounded queues are not processed
+    and show up in the queues section instead.
+    """
+    from mesh_handler import MeshHandler
+
+    writer = CountingWriter(latency=db_latency)
+    handler = MeshHandler(None, workers=workers, batch_size=batch_size, writer=writer)
+    interface = SimulatedInterface(packets, speed=speed)
+
+    latencies = {message_type: [] for message_type in handler.handlers}
+    for message_type, handle in list(handler.handlers.items()):
+        def timed(message, handle=handle, recorded=latencies[message_type]):
+            # list.append is atomic, so workers can share these lists
+            recorded.append(time.monotonic() - message['enqueued_at'])
+            handle(message)
+        handler.handlers[message_type] = timed
+
+    if not handler.connect(interface=interface):
+        raise RuntimeError('Could not connect to the simulated interface')
+    start = time.monotonic()
+    interface.start()
+    interface.wait()
+    handler.stop()
+    elapsed = time.monotonic() - start
+
+    stats = handler.get_stats()
+    processed = sum(len(values) for values in latencies.values())
+    every = np.concatenate([np.asarray(v, dtype=float) for v in latencies.values()])
+    report = {
+        'packets': len(interface.packets),
+        'nodes': len(interface.node_ids()),
+        'workers': handler.workers,
+        'batch_size': handler.batch_size,
+        'replay_seconds': interface.replay_seconds,
+        'elapsed_seconds': elapsed,
+        'processed': processed,
+        'msgs_per_sec': processed / elapsed if elapsed else None,
+        'ingest_per_sec': interface.delivered / elapsed if elapsed else None,
+        'queue_latency_ms': {
+            'p50': _percentile_ms(every, 50),
+            'p95': _percentile_ms(every, 95),
+            'p99': _percentile_ms(every, 99),
+            'max': _percentile_ms(every, 100)
+        },
+        'types': {},
+        'db': {
+            'batches': writer.batches,
+            'locations': writer.locations,
+            'messages': writer.messages,
+            'rows_per_sec': (writer.locations + writer.messages) / elapsed if elapsed else None,
+            'batches_per_sec': writer.batches / elapsed if elapsed else None,
+            'locations_coalesced': stats['db_writes']['locations_coalesced']
+        },
+        'queues': stats['queues'],
+        'emergency_slo': stats['emergency_slo'],
+        'broadcasts': len(interface.sent)
+    }
+    for message_type, values in latencies.items():
+        if not values:
+            continue
+        values = np.asarray(values, dtype=float)
+        report['types'][message_type] = {
+            'count': len(values),
+            'errors': stats['types'].get(message_type, {}).get('errors', 0),
+            'queue_p50_ms': _percentile_ms(values, 50),
+            'queue_p95_ms': _percentile_ms(values, 95),
+            'queue_p99_ms': _percentile_ms(values, 99)
+        }
+    return report
+
+def _parse_rates(values):
+    rates = {}
+    for value in values or []:
+        message_type, _, rate = value.partition('=')
+        if message_type not in MESSAGE_TYPES or not rate:
+            raise argparse.ArgumentTypeError(
+                f"Rates look like TYPE=PER_SECOND with TYPE one of {', '.join(MESSAGE_TYPES)}"
+            )
+        rates[message_type] = float(rate)
+    return rates
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark MeshHandler with simulated mesh traffic')
+    parser.add_argument('--nodes', type=int, default=50)
+    parser.add_argument('--duration', type=float, default=10.0,
+                        help='Seconds of synthetic traffic')
+    parser.add_argument('--rate', action='append', metavar='TYPE=PER_SECOND',
+                        help='Packets per second for a message type; repeatable')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help='Replay speed multiplier; 0 replays as fast as possible')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--batch-size', type=int, default=None)
+    parser.add_argument('--db-latency', type=float, default=0.0,
+                        help='Simulated seconds per database batch')
+    parser.add_argument('--replay', metavar='PATH', help='Replay a recorded stream')
+    parser.add_argument('--record', metavar='PATH',
+                        help='Save the synthetic stream instead of running the benchmark')
+    args = parser.parse_args(argv)
+
+    try:
+        rates = _parse_rates(args.rate)
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+
+    if args.replay:
+        packets = load_recording(args.replay)
+    else:
+        packets = synthetic_packets(nodes=args.nodes, duration=args.duration,
+                                    rates=rates, seed=args.seed)
+    if args.record:
+        count = save_recording(packets, args.record)
+        print(f"Recorded {count} packets to {args.record}")
+        return 0
+
+    report = run_benchmark(packets, workers=args.workers, batch_size=args.batch_size,
+                           speed=args.speed, db_latency=args.db_latency)
+    print(json.dumps(report, indent=2))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,202 @@
+import os
+import math
+import time
+from datetime import datetime, timezone
+from threading import Lock
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = 111.32
+
+def _to_epoch(timestamp):
+    """Seconds since the epoch; naive datetimes are taken as UTC"""
+    if isinstance(timestamp, datetime):
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.replace(tzinfo=timezone.utc)
+        return timestamp.timestamp()
+    return float(timestamp)
+
+def _haversine_km(lat, lon, lats, lons):
+    lat1, lon1 = math.radians(lat), math.radians(lon)
+    lat2, lon2 = np.radians(lats), np.radians(lons)
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+class _NodeTrack:
+    """Fixed-size ring buffer of one node's positions"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.ts = np.zeros(capacity, dtype=np.float64)
+        self.lat = np.zeros(capacity, dtype=np.float64)
+        self.lon = np.zeros(capacity, dtype=np.float64)
+        self.alt = np.full(capacity, np.nan, dtype=np.float32)
+        self.battery = np.full(capacity, np.nan, dtype=np.float32)
+        self.next = 0
+        self.size = 0
+
+    def append(self, ts, lat, lon, alt, battery):
+        i = self.next
+        self.ts[i] = ts
+        self.lat[i] = lat
+        self.lon[i] = lon
+        self.alt[i] = np.nan if alt is None else alt
+        self.battery[i] = np.nan if battery is None else battery
+        self.next = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def order(self):
+        """Buffer indexes of the stored points, oldest first"""
+        start = (self.next - self.size) % self.capacity
+        index = (start + np.arange(self.size)) % self.capacity
+        # Points can arrive out of order from several workers
+        return index[np.argsort(self.ts[index], kind='stable')]
+
+class TrackStore:
+    """Position history for mesh nodes with a spatial index over recent fixes.
+
+    Each node keeps its last capacity positions (timestamp, lat, lon,
+    altitude, battery) in preallocated arrays. A grid of cell_deg degree
+    cells records which nodes reported from each cell within the last
+    index_window seconds, so a radius query only looks at the nodes seen
+    in the cells it overlaps. Entries older than the window are pruned as
+    new positions arrive; queries reaching further back than the window
+    fall back to checking every node.
+    """
+
+    def __init__(self, capacity=None, cell_deg=0.01, index_window=None):
+        self.capacity = capacity or int(os.getenv('MESH_TRACK_CAPACITY', 1024))
+        self.cell_deg = cell_deg
+        self.index_window = index_window or float(os.getenv('MESH_TRACK_INDEX_WINDOW', 3600))
+        self._tracks = {}
+        self._cells = {}
+        self._lock = Lock()
+        self._newest = 0.0
+        self._appends_since_prune = 0
+
+    def _cell(self, lat, lon):
+        return int(math.floor(lat / self.cell_deg)), int(math.floor(lon / self.cell_deg))
+
+    def append(self, node_id, timestamp, lat, lon, alt=None, battery=None):
+        """Record a position fix for a node"""
+        ts = _to_epoch(timestamp)
+        with self._lock:
+            track = self._tracks.get(node_id)
+            if track is None:
+                track = self._tracks[node_id] = _NodeTrack(self.capacity)
+            track.append(ts, lat, lon, alt, battery)
+
+            nodes = self._cells.setdefault(self._cell(lat, lon), {})
+            nodes[node_id] = max(ts, nodes.get(node_id, ts))
+            self._newest = max(self._newest, ts)
+
+            self._appends_since_prune += 1
+            if self._appends_since_prune >= 1024:
+                self._prune()
+
+    def _prune(self):
+        """Drop index entries older than the index window"""
+        cutoff = self._newest - self.index_window
+        for cell in list(self._cells):
+            nodes = self._cells[cell]
+            for node_id in [n for n, ts in nodes.items() if ts < cutoff]:
+                del nodes[node_id]
+            if not nodes:
+                del self._cells[cell]
+        self._appends_since_prune = 0
+
+    def _candidates(self, lat, lon, radius_km, since):
+        """Nodes that may have been within radius_km of a point since a time"""
+        if since < self._newest - self.index_window:
+            return list(self._tracks)
+
+        dlat = radius_km / KM_PER_DEGREE_LAT
+        dlon = radius_km / (KM_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 0.01))
+        row0, col0 = self._cell(lat - dlat, lon - dlon)
+        row1, col1 = self._cell(lat + dlat, lon + dlon)
+
+        candidates = set()
+        if (row1 - row0 + 1) * (col1 - col0 + 1) > len(self._cells):
+            # Fewer occupied cells than cells in the box; walk those instead
+            cells = (
+                nodes for (row, col), nodes in self._cells.items()
+                if row0 <= row <= row1 and col0 <= col <= col1
+            )
+        else:
+            cells = (
+                self._cells.get((row, col), {})
+                for row in range(row0, row1 + 1) for col in range(col0, col1 + 1)
+            )
+        for nodes in cells:
+            candidates.update(n for n, ts in nodes.items() if ts >= since)
+        return candidates
+
+    def nearby(self, lat, lon, radius_km, window_seconds=600, now=None, exclude=None):
+        """Nodes that reported within radius_km of (lat, lon) in the last window
+
+        Returns one entry per node with its most recent fix inside the
+        radius, nearest first.
+        """
+        now = time.time() if now is None else _to_epoch(now)
+        since = now - window_seconds
+        results = []
+        with self._lock:
+            for node_id in self._candidates(lat, lon, radius_km, since):
+                if node_id == exclude:
+                    continue
+                track = self._tracks[node_id]
+                index = track.order()
+                index = index[(track.ts[index] >= since) & (track.ts[index] <= now)]
+                if not index.size:
+                    continue
+                distances = _haversine_km(lat, lon, track.lat[index], track.lon[index])
+                inside = np.flatnonzero(distances <= radius_km)
+                if not inside.size:
+                    continue
+                last = inside[-1]
+                i = index[last]
+                results.append({
+                    'node_id': node_id,
+                    'timestamp': datetime.fromtimestamp(track.ts[i], timezone.utc),
+                    'lat': float(track.lat[i]),
+                    'lon': float(track.lon[i]),
+                    'alt': None if np.isnan(track.alt[i]) else float(track.alt[i]),
+                    'battery': None if np.isnan(track.battery[i]) else float(track.battery[i]),
+                    'distance_km': float(distances[last])
+                })
+        return sorted(results, key=lambda r: r['distance_km'])
+
+    def track(self, node_id, start=None, end=None):
+        """A node's stored positions in time order, as arrays for replay"""
+        with self._lock:
+            track = self._tracks.get(node_id)
+            if track is None:
+                return None
+            index = track.order()
+            if start is not None:
+                index = index[track.ts[index] >= _to_epoch(start)]
+            if end is not None:
+                index = index[track.ts[index] <= _to_epoch(end)]
+            return {
+                'timestamp': track.ts[index].copy(),
+                'lat': track.lat[index].copy(),
+                'lon': track.lon[index].copy(),
+                'alt': track.alt[index].copy(),
+                'battery': track.battery[index].copy()
+            }
+
+    def latest(self, node_id):
+        """A node's most recent fix, or None"""
+        points = self.track(node_id)
+        if points is None or not points['timestamp'].size:
+            return None
+        return {name: float(values[-1]) for name, values in points.items()}
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'nodes': len(self._tracks),
+                'points': sum(track.size for track in self._tracks.values()),
+                'indexed_cells': len(self._cells)
+            }
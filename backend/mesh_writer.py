@@ -0,0 +1,212 @@
+import os
+import time
+import logging
+from collections import deque
+from contextlib import nullcontext
+from threading import Event, Lock, Thread
+from sqlalchemy import bindparam
+
+logger = logging.getLogger(__name__)
+
+class MeshWriteBuffer:
+    """Write-behind buffer for mesh location updates and text messages.
+
+    Location updates are coalesced per node, keeping only the newest
+    position, and messages are collected in arrival order. Everything
+    pending is handed to the writer in one call when max_pending
+    items are buffered or flush_interval seconds have passed, whichever
+    comes first. If the writer fails, the batch is merged back into the
+    buffer and flushing backs off exponentially, up to max_backoff seconds.
+    While backing off, adds no longer flush inline; only the background
+    thread retries. At most max_buffered messages are held, and the oldest
+    are dropped beyond that, so a dead database cannot grow memory without
+    bound.
+    """
+
+    def __init__(self, writer, max_pending=None, flush_interval=None,
+                 max_buffered=None, max_backoff=None):
+        self.writer = writer
+        self.max_pending = max_pending or int(os.getenv('MESH_FLUSH_SIZE', 500))
+        self.flush_interval = flush_interval or float(os.getenv('MESH_FLUSH_INTERVAL', 2.0))
+        self.max_buffered = max_buffered or int(os.getenv('MESH_MAX_BUFFERED', 10000))
+        self.max_backoff = max_backoff or float(os.getenv('MESH_MAX_BACKOFF', 60.0))
+        self._locations = {}
+        self._messages = deque()
+        self._lock = Lock()
+        self._flush_lock = Lock()
+        self._stop = Event()
+        self._thread = None
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.locations_written = 0
+        self.messages_written = 0
+        self.locations_coalesced = 0
+        self.messages_dropped = 0
+        self.last_flush_seconds = None
+        self._consecutive_failures = 0
+        self._retry_at = 0.0
+
+    def add_location(self, mesh_id, position, timestamp):
+        """Buffer a node's position; replaces an older pending one"""
+        with self._lock:
+            pending = self._locations.get(mesh_id)
+            if pending is not None:
+                self.locations_coalesced += 1
+                if pending['timestamp'] > timestamp:
+                    return
+            self._locations[mesh_id] = {
+                'mesh_id': mesh_id,
+                'position': position,
+                'timestamp': timestamp
+            }
+            full = len(self._locations) + len(self._messages) >= self.max_pending
+        if full and not self.backing_off():
+            self.flush()
+
+    def add_message(self, content, sender_id, timestamp):
+        """Buffer a text message for a bulk insert"""
+        with self._lock:
+            self._messages.append({
+                'content': content,
+                'sender_id': sender_id,
+                'timestamp': timestamp
+            })
+            self._trim_messages()
+            full = len(self._locations) + len(self._messages) >= self.max_pending
+        if full and not self.backing_off():
+            self.flush()
+
+    def _trim_messages(self):
+        """Drop the oldest messages beyond max_buffered; call with _lock held"""
+        while len(self._messages) > self.max_buffered:
+            self._messages.popleft()
+            self.messages_dropped += 1
+
+    def backing_off(self):
+        """Whether a failed flush is waiting out its backoff"""
+        return time.monotonic() < self._retry_at
+
+    def pending(self):
+        with self._lock:
+            return len(self._locations) + len(self._messages)
+
+    def flush(self):
+        """Write everything pending in one batch"""
+        # One flush at a time keeps batches in order
+        with self._flush_lock:
+            with self._lock:
+                locations, self._locations = self._locations, {}
+                messages, self._messages = self._messages, deque()
+            if not locations and not messages:
+                return
+
+            start = time.monotonic()
+            try:
+                self.writer.write(list(locations.values()), list(messages))
+            except Exception as e:
+                self.failed_flushes += 1
+                self._consecutive_failures += 1
+                backoff = min(self.max_backoff,
+                              self.flush_interval * 2 ** (self._consecutive_failures - 1))
+                self._retry_at = time.monotonic() + backoff
+                logger.error(f"Error flushing mesh writes, retrying in {backoff:.1f}s: {e}")
+                with self._lock:
+                    for mesh_id, location in locations.items():
+                        newer = self._locations.get(mesh_id)
+                        if newer is None or newer['timestamp'] < location['timestamp']:
+                            self._locations[mesh_id] = location
+                    self._messages.extendleft(reversed(messages))
+                    self._trim_messages()
+                return
+
+            self._consecutive_failures = 0
+            self._retry_at = 0.0
+            self.last_flush_seconds = time.monotonic() - start
+            self.flushes += 1
+            self.locations_written += len(locations)
+            self.messages_written += len(messages)
+
+    def start(self):
+        """Start the background thread that flushes on the time threshold"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the flush thread and write whatever is still pending"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            if not self.backing_off():
+                self.flush()
+
+    def get_stats(self):
+        return {
+            'pending': self.pending(),
+            'flushes': self.flushes,
+            'failed_flushes': self.failed_flushes,
+            'locations_written': self.locations_written,
+            'messages_written': self.messages_written,
+            'locations_coalesced': self.locations_coalesced,
+            'messages_dropped': self.messages_dropped,
+            'backing_off': self.backing_off(),
+            'last_flush_ms': self.last_flush_seconds * 1000
+                             if self.last_flush_seconds is not None else None
+        }
+
+class SQLAlchemyMeshWriter:
+    """Writes a buffered batch with one executemany UPDATE for user
+    locations, one bulk INSERT for messages and a single commit"""
+
+    def __init__(self, db, app=None, user_model=None, message_model=None):
+        self.db = db
+        self.app = app
+        self.user_model = user_model
+        self.message_model = message_model
+
+    def _models(self):
+        if self.user_model is None or self.message_model is None:
+            from models import User, Message
+            self.user_model = self.user_model or User
+            self.message_model = self.message_model or Message
+        return self.user_model, self.message_model
+
+    def write(self, locations, messages):
+        user_model, message_model = self._models()
+        context = self.app.app_context() if self.app is not None else nullcontext()
+        with context:
+            session = self.db.session
+            try:
+                if locations:
+                    users = user_model.__table__
+                    statement = (
+                        users.update()
+                        .where(users.c.mesh_id == bindparam('b_mesh_id'))
+                        .values(last_location=bindparam('b_last_location'),
+                                last_seen=bindparam('b_last_seen'))
+                    )
+                    session.execute(statement, [
+                        {
+                            'b_mesh_id': location['mesh_id'],
+                            'b_last_location': f"{location['position'].get('lat', 0)},"
+                                               f"{location['position'].get('lon', 0)}",
+                            'b_last_seen': location['timestamp']
+                        }
+                        for location in locations
+                    ])
+                if messages:
+                    session.execute(message_model.__table__.insert(), messages)
+                session.commit()
+            except Exception:
+                session.rollback()
+                raise
+            finally:
+                # Writes happen on background threads; hand the connection back
+                self.db.session.remove()
@@ -2,12 +2,20 @@ import numpy as np
 from sklearn.ensemble import RandomForestRegressor, GradientBoostingClassifier
 from sklearn.preprocessing import StandardScaler
 from datetime import datetime, timedelta
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 import joblib
 import os
+from services.training_config import TrainingConfig
+from services.uncertainty import ensemble_confidence
 
 class HuntingPredictor:
-    def __init__(self):
+    ACTIVITY_FEATURES = [
+        'hour', 'temperature', 'wind_speed', 'precipitation',
+        'light_level', 'moon_phase', 'pressure_trend'
+    ]
+    
+    def __init__(self, training_config: Optional[TrainingConfig] = None):
+        self.training_config = training_config or TrainingConfig.from_env()
         self.success_model = None
         self.activity_model = None
         self.movement_model = None
@@ -36,7 +44,7 @@ class HuntingPredictor:
             y.append(record['success_rate'])
             
         X = self.scaler.fit_transform(X)
-        self.success_model.fit(X, y)
+        return self.training_config.fit(self.success_model, X, y, name='success')
         
     def train_activity_model(self, movement_data: List[Dict]):
         """Train the animal activity prediction model"""
@@ -48,7 +56,7 @@ class HuntingPredictor:
             y.append(record['activity_level'])
             
         X = self.scaler.fit_transform(X)
-        self.activity_model.fit(X, y)
+        return self.training_config.fit(self.activity_model, X, y, name='activity')
         
     def train_movement_model(self, movement_data: List[Dict]):
         """Train the movement pattern prediction model"""
@@ -60,7 +68,7 @@ class HuntingPredictor:
             y.append(record['location_type'])
             
         X = self.scaler.fit_transform(X)
-        self.movement_model.fit(X, y)
+        return self.training_config.fit(self.movement_model, X, y, name='movement')
         
     def predict_success(self, gmu_id: str, conditions: Dict) -> Dict:
         """Predict hunting success probability"""
@@ -82,29 +90,53 @@ class HuntingPredictor:
         
     def predict_hourly_activity(self, conditions: Dict) -> List[Dict]:
         """Predict animal activity levels for each hour"""
-        predictions = []
-        base_time = datetime.now()
-        
-        for hour in range(24):
-            time = base_time + timedelta(hours=hour)
-            conditions['hour'] = time.hour
-            
-            features = self._extract_activity_features(conditions)
-            X = self.scaler.transform([features])
-            
-            activity_level = self.activity_model.predict(X)[0]
-            confidence = self._calculate_prediction_confidence(
-                self.activity_model, X, activity_level
-            )
+        return self.predict_activity_batch({None: conditions})[None]
+        
+    def predict_activity_batch(self,
+                               conditions_by_gmu: Dict[str, Dict],
+                               start_time: Optional[datetime] = None,
+                               hours: int = 24) -> Dict[str, List[Dict]]:
+        """Predict hourly activity levels for several GMUs over any horizon
+        
+        Every (GMU, hour) row goes through one scaler transform, one model
+        predict and one pass over the ensemble's trees. Condition values may
+        be scalars or sequences with one value per hour. The caller's
+        conditions are not modified.
+        """
+        start_time = start_time or datetime.now()
+        times = [start_time + timedelta(hours=hour) for hour in range(hours)]
+        gmu_ids = list(conditions_by_gmu)
+        if not times or not gmu_ids:
+            return {gmu_id: [] for gmu_id in gmu_ids}
             
-            predictions.append({
-                'hour': time.strftime('%H:00'),
-                'activity_level': float(activity_level),
-                'confidence': float(confidence),
-                'factors': self._get_feature_importance(
-                    self.activity_model, features
-                )
-            })
+        hours_of_day = np.array([time.hour for time in times], dtype=float)
+        features = np.vstack([
+            self._build_activity_matrix(conditions_by_gmu[gmu_id], hours_of_day)
+            for gmu_id in gmu_ids
+        ])
+        X = self.scaler.transform(features)
+        
+        activity_levels = self.activity_model.predict(X).reshape(len(gmu_ids), hours)
+        confidences = self._calculate_prediction_confidences(
+            self.activity_model, X
+        ).reshape(len(gmu_ids), hours)
+        # Importances are a property of the model, not of the row
+        factors = self._get_feature_importance(self.activity_model, features[0])
+        
+        labels = [time.strftime('%H:00') for time in times]
+        timestamps = [time.strftime('%Y-%m-%d %H:00') for time in times]
+        predictions = {}
+        for i, gmu_id in enumerate(gmu_ids):
+            predictions[gmu_id] = [
+                {
+                    'hour': labels[j],
+                    'time': timestamps[j],
+                    'activity_level': float(activity_levels[i, j]),
+                    'confidence': float(confidences[i, j]),
+                    'factors': dict(factors)
+                }
+                for j in range(hours)
+            ]
             
         return predictions
         
@@ -149,15 +181,18 @@ class HuntingPredictor:
         
     def _extract_activity_features(self, conditions: Dict) -> List[float]:
         """Extract features for activity prediction"""
-        return [
-            conditions.get('hour', 0),
-            conditions.get('temperature', 0),
-            conditions.get('wind_speed', 0),
-            conditions.get('precipitation', 0),
-            conditions.get('light_level', 0),
-            conditions.get('moon_phase', 0),
-            conditions.get('pressure_trend', 0)
+        return [conditions.get(name, 0) for name in self.ACTIVITY_FEATURES]
+        
+    def _build_activity_matrix(self, conditions: Dict, hours_of_day: np.ndarray) -> np.ndarray:
+        """Build an hours x features activity matrix for one set of conditions"""
+        n_hours = len(hours_of_day)
+        columns = [
+            hours_of_day if name == 'hour' else np.broadcast_to(
+                np.asarray(conditions.get(name, 0), dtype=float), (n_hours,)
+            )
+            for name in self.ACTIVITY_FEATURES
         ]
+        return np.column_stack(columns)
         
     def _extract_movement_features(self, conditions: Dict) -> List[float]:
         """Extract features for movement prediction"""
@@ -174,13 +209,12 @@ class HuntingPredictor:
         
     def _calculate_prediction_confidence(self, model, X, prediction) -> float:
         """Calculate confidence level for a prediction"""
-        if hasattr(model, 'estimators_'):
-            # For ensemble models, use the variance of predictions
-            predictions = np.array([tree.predict(X)[0] 
-                                 for tree in model.estimators_])
-            confidence = 1.0 - (np.std(predictions) / np.mean(predictions))
-            return max(min(confidence, 1.0), 0.0)
-        return 0.8  # Default confidence if can't calculate
+        return float(self._calculate_prediction_confidences(model, X)[0])
+        
+    def _calculate_prediction_confidences(self, model, X) -> np.ndarray:
+        """Calculate confidence levels for every row of X"""
+        # Spread of the ensemble members relative to their mean
+        return ensemble_confidence(model, X, relative=True)
         
     def _get_feature_importance(self, model, features: List[float]) -> Dict:
         """Get the importance of each feature in the prediction"""
@@ -0,0 +1,47 @@
+from flask import Blueprint, jsonify, request
+from flask_login import login_required
+from services.ml_service import MLService
+
+ml_blueprint = Blueprint('ml', __name__)
+ml_service = MLService()
+
+# Upper bound on scenarios per request; larger sweeps should be split
+MAX_BATCH_ROWS = 100000
+
+@ml_blueprint.route('/api/ml/batch', methods=['POST'])
+@login_required
+def predict_batch():
+    """Run a columnar batch of scenarios through one of the ML models
+
+    Expects {"model": "movement" | "behavior" | "success",
+             "columns": {feature: [values...] or value, ...}}
+    """
+    try:
+        data = request.get_json() or {}
+        model_type = data.get('model')
+        columns = data.get('columns')
+
+        predictors = {
+            'movement': ml_service.predict_movement_batch,
+            'behavior': ml_service.predict_behavior_batch,
+            'success': ml_service.predict_success_batch
+        }
+        if model_type not in predictors:
+            return jsonify({"error": "model must be one of: movement, behavior, success"}), 400
+        if not isinstance(columns, dict):
+            return jsonify({"error": "columns must be an object of feature arrays"}), 400
+
+        row_counts = {len(v) for v in columns.values() if isinstance(v, list)}
+        if row_counts and max(row_counts) > MAX_BATCH_ROWS:
+            return jsonify({"error": f"Batch exceeds {MAX_BATCH_ROWS} rows"}), 400
+
+        result = predictors[model_type](columns)
+        return jsonify({
+            "model": model_type,
+            "count": int(len(result['confidence'])),
+            **{name: values.tolist() for name, values in result.items()}
+        })
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
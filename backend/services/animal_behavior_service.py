@@ -1,6 +1,8 @@
-from datetime import datetime
+import calendar
+from datetime import date as date_type, datetime
 import numpy as np
-from typing import Dict, List, Tuple
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
 
 class AnimalBehaviorService:
     def __init__(self):
@@ -46,28 +48,56 @@ class AnimalBehaviorService:
             }
         }
         
-    def _is_date_between(self, check_date: datetime, start: Tuple[int, int], end: Tuple[int, int]) -> float:
-        """Calculate how deep into a period a date is (0-1)"""
-        def _to_day_of_year(month, day):
-            return datetime(check_date.year, month, day).timetuple().tm_yday
-            
-        start_day = _to_day_of_year(start[0], start[1])
-        end_day = _to_day_of_year(end[0], end[1])
-        check_day = check_date.timetuple().tm_yday
+        # Season windows as (start, end) day-of-year, per (animal, year)
+        self._season_windows = {}
         
+    def _to_day_of_year(self, year: int, month: int, day: int) -> int:
+        """Day of year for a (month, day), rolling months past December into
+        the next year and clamping days past the end of the month"""
+        if month > 12:
+            year, month = year + 1, month - 12
+        day = min(day, calendar.monthrange(year, month)[1])
+        return date_type(year, month, day).timetuple().tm_yday
+
+    def _get_season_windows(self, animal_type: str, year: int) -> Dict[str, Tuple[int, int]]:
+        """Get (start, end) day-of-year for each seasonal period, cached per year"""
+        key = (animal_type, year)
+        windows = self._season_windows.get(key)
+        if windows is None:
+            pattern = self.animal_patterns[animal_type]
+            spring = pattern['migration_spring']
+            fall = pattern['migration_fall']
+            periods = {
+                'breeding': (pattern['rutting_start'], pattern['rutting_end']),
+                'birth': (pattern.get('calving_start', pattern.get('fawning_start')),
+                          pattern.get('calving_end', pattern.get('fawning_end'))),
+                # Migrations last one month from their start date
+                'migration_spring': (spring, (spring[0] + 1, spring[1])),
+                'migration_fall': (fall, (fall[0] + 1, fall[1]))
+            }
+            windows = {
+                name: (self._to_day_of_year(year, *start), self._to_day_of_year(year, *end))
+                for name, (start, end) in periods.items()
+            }
+            self._season_windows[key] = windows
+        return windows
+
+    def _season_depth(self, check_day: np.ndarray, start_day: np.ndarray,
+                      end_day: np.ndarray) -> np.ndarray:
+        """Calculate how deep into a period each day is (0-1)"""
         # Handle year wraparound (e.g., Nov-Feb period)
-        if end_day < start_day:
-            end_day += 365
-            if check_day < start_day:
-                check_day += 365
-                
-        if start_day <= check_day <= end_day:
-            return (check_day - start_day) / (end_day - start_day)
-        return 0.0
+        wraps = end_day < start_day
+        end_day = np.where(wraps, end_day + 365, end_day)
+        check_day = np.where(wraps & (check_day < start_day), check_day + 365, check_day)
+        
+        inside = (start_day <= check_day) & (check_day <= end_day)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            depth = (check_day - start_day) / (end_day - start_day)
+        return np.where(inside, depth, 0.0)
 
-    def _get_time_of_day_factor(self, current_time: datetime) -> Dict[str, float]:
-        """Calculate activity factors for different times of day"""
-        hour = current_time.hour + current_time.minute / 60
+    def _get_time_of_day_factors(self, hours: np.ndarray) -> Dict[str, np.ndarray]:
+        """Calculate activity factors for arrays of fractional hours"""
+        hours = np.asarray(hours, dtype=float)
         
         # Define time periods
         dawn_center = 6.5   # 6:30 AM
@@ -75,9 +105,14 @@ class AnimalBehaviorService:
         period_width = 2.0  # 2 hours
         
         # Calculate activity factors using gaussian curves
-        dawn_factor = np.exp(-((hour - dawn_center) ** 2) / (2 * period_width ** 2))
-        dusk_factor = np.exp(-((hour - dusk_center) ** 2) / (2 * period_width ** 2))
-        day_factor = np.sin(np.pi * (hour - dawn_center) / (dusk_center - dawn_center)) if dawn_center <= hour <= dusk_center else 0
+        dawn_factor = np.exp(-((hours - dawn_center) ** 2) / (2 * period_width ** 2))
+        dusk_factor = np.exp(-((hours - dusk_center) ** 2) / (2 * period_width ** 2))
+        daytime = (dawn_center <= hours) & (hours <= dusk_center)
+        day_factor = np.where(
+            daytime,
+            np.sin(np.pi * (hours - dawn_center) / (dusk_center - dawn_center)),
+            0.0
+        )
         night_factor = 1 - day_factor
         
         return {
@@ -87,44 +122,92 @@ class AnimalBehaviorService:
             'night': night_factor
         }
 
+    def get_activity_factors(self, animal_type: str, hours) -> np.ndarray:
+        """Time-of-day activity factor for an animal at each of many hours"""
+        pattern = self.animal_patterns[animal_type]
+        time_factors = self._get_time_of_day_factors(hours)
+        return np.max([time_factors[period] for period in pattern['activity_periods']], axis=0)
+
     def get_behavior_factors(self, animal_type: str, date: datetime, elevation: float) -> Dict[str, float]:
         """Get behavior factors for a specific animal type at a given time and elevation"""
-        pattern = self.animal_patterns.get(animal_type)
-        if not pattern:
+        if animal_type not in self.animal_patterns:
             return None
             
-        # Calculate breeding season factor
-        breeding_factor = self._is_date_between(date, 
-                                              pattern['rutting_start'],
-                                              pattern['rutting_end'])
-                                              
-        # Calculate birth season factor
-        birth_season = self._is_date_between(date,
-                                           pattern['calving_start'] if 'calving_start' in pattern else pattern['fawning_start'],
-                                           pattern['calving_end'] if 'calving_end' in pattern else pattern['fawning_end'])
-                                           
-        # Calculate migration factor
-        migration_spring = self._is_date_between(date,
-                                               pattern['migration_spring'],
-                                               (pattern['migration_spring'][0] + 1, pattern['migration_spring'][1]))
-        migration_fall = self._is_date_between(date,
-                                             pattern['migration_fall'],
-                                             (pattern['migration_fall'][0] + 1, pattern['migration_fall'][1]))
-        migration_factor = max(migration_spring, migration_fall)
+        factors = self._compute_behavior_factors(
+            np.array([animal_type], dtype=object),
+            pd.DatetimeIndex([date]),
+            np.array([elevation], dtype=float)
+        )
+        return {name: float(values[0]) for name, values in factors.items()}
+
+    def get_behavior_factors_batch(self, animal_types, timestamps, elevations) -> pd.DataFrame:
+        """Get behavior factors for arrays of timestamps and elevations
+        
+        animal_types may be one species for every row or one per row.
+        Returns a DataFrame with one row per timestamp and a column per
+        factor; rows for unknown species are NaN.
+        """
+        timestamps = pd.DatetimeIndex(timestamps)
+        n = len(timestamps)
+        if isinstance(animal_types, str):
+            animal_types = np.full(n, animal_types, dtype=object)
+        animal_types = np.asarray(animal_types, dtype=object)
+        elevations = np.broadcast_to(np.asarray(elevations, dtype=float), (n,))
+        
+        factors = self._compute_behavior_factors(animal_types, timestamps, elevations)
+        return pd.DataFrame(factors, index=timestamps)
+
+    def _compute_behavior_factors(self, animal_types: np.ndarray,
+                                  timestamps: pd.DatetimeIndex,
+                                  elevations: np.ndarray) -> Dict[str, np.ndarray]:
+        """Vectorized behavior factors; species and years are resolved once each"""
+        n = len(timestamps)
+        years = np.asarray(timestamps.year)
+        months = np.asarray(timestamps.month)
+        check_days = np.asarray(timestamps.dayofyear)
+        hours = np.asarray(timestamps.hour) + np.asarray(timestamps.minute) / 60
+        summer = (4 <= months) & (months <= 9)
         
-        # Calculate elevation preference
-        season = 'summer' if 4 <= date.month <= 9 else 'winter'
-        elev_min, elev_max = pattern['elevation_preference'][season]
-        elevation_factor = max(0, min(1, (elevation - elev_min) / (elev_max - elev_min)))
+        names = ('breeding', 'birth', 'migration_spring', 'migration_fall')
+        starts = {name: np.zeros(n) for name in names}
+        ends = {name: np.zeros(n) for name in names}
+        elev_min = np.full(n, np.nan)
+        elev_max = np.full(n, np.nan)
+        activity_factor = np.full(n, np.nan)
         
-        # Calculate time of day activity
-        time_factors = self._get_time_of_day_factor(date)
-        activity_factor = max(time_factors[period] for period in pattern['activity_periods'])
+        for animal_type in pd.unique(animal_types):
+            rows = animal_types == animal_type
+            pattern = self.animal_patterns.get(animal_type)
+            if pattern is None:
+                continue
+                
+            for year in np.unique(years[rows]):
+                year_rows = rows & (years == year)
+                for name, (start, end) in self._get_season_windows(animal_type, int(year)).items():
+                    starts[name][year_rows] = start
+                    ends[name][year_rows] = end
+                    
+            # Calculate elevation preference by season
+            summer_min, summer_max = pattern['elevation_preference']['summer']
+            winter_min, winter_max = pattern['elevation_preference']['winter']
+            elev_min[rows] = np.where(summer[rows], summer_min, winter_min)
+            elev_max[rows] = np.where(summer[rows], summer_max, winter_max)
+            
+            # Calculate time of day activity
+            activity_factor[rows] = self.get_activity_factors(animal_type, hours[rows])
+            
+        depth = {
+            name: self._season_depth(check_days, starts[name], ends[name]) for name in names
+        }
+        known = ~np.isnan(elev_min)
+        elevation_factor = np.clip((elevations - elev_min) / (elev_max - elev_min), 0, 1)
         
         return {
-            'breeding_factor': breeding_factor,
-            'birth_season_factor': birth_season,
-            'migration_factor': migration_factor,
+            'breeding_factor': np.where(known, depth['breeding'], np.nan),
+            'birth_season_factor': np.where(known, depth['birth'], np.nan),
+            'migration_factor': np.where(
+                known, np.maximum(depth['migration_spring'], depth['migration_fall']), np.nan
+            ),
             'elevation_factor': elevation_factor,
             'activity_factor': activity_factor
         }
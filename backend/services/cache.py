@@ -0,0 +1,141 @@
+import sys
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Dict, Hashable, Optional, Tuple
+import numpy as np
+
+# ~30 m in latitude; close enough to a terrain cell for lookup reuse
+COORD_STEP_DEG = 0.0003
+
+_MISSING = object()
+
+def quantize_point(lat: float, lon: float, step: float = COORD_STEP_DEG) -> Tuple[int, int]:
+    """Snap a coordinate to an integer grid so nearby queries share a key"""
+    return int(round(lat / step)), int(round(lon / step))
+
+def _estimate_size(value: Any) -> int:
+    """Rough size in bytes of a cached value and what it references"""
+    if isinstance(value, np.ndarray):
+        return value.nbytes + 112
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(_estimate_size(k) + _estimate_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set)):
+        size += sum(_estimate_size(v) for v in value)
+    return size
+
+class LRUCache:
+    """Thread-safe LRU cache with a TTL, an entry/memory cap and counters.
+
+    Entries expire ttl seconds after they are written. When either
+    max_entries or max_bytes is exceeded the least recently used entries
+    are evicted. Supports the dict operations the services already use
+    (get, in, [], len).
+    """
+
+    def __init__(self, max_entries: int = 10000,
+                 max_bytes: Optional[int] = None,
+                 ttl: Optional[float] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get a cached value, counting the lookup as a hit or miss"""
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                value, expires_at, size = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+                self._bytes -= size
+                self.expirations += 1
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any):
+        """Store a value, evicting least recently used entries if over a cap"""
+        size = _estimate_size(value) if self.max_bytes else 0
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            old = self._data.pop(key, _MISSING)
+            if old is not _MISSING:
+                self._bytes -= old[2]
+            self._data[key] = (value, expires_at, size)
+            self._bytes += size
+            while self._data and (
+                len(self._data) > self.max_entries
+                or (self.max_bytes and self._bytes > self.max_bytes)
+            ):
+                _, (_, _, evicted_size) = self._data.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and current occupancy"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._data),
+                'bytes': self._bytes if self.max_bytes else None,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
+
+    def __getitem__(self, key: Hashable) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: Hashable, value: Any):
+        self.set(key, value)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            return entry is not _MISSING and (
+                entry[1] is None or entry[1] > time.monotonic()
+            )
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+_caches: Dict[str, LRUCache] = {}
+_caches_lock = Lock()
+
+def get_cache(name: str, **kwargs) -> LRUCache:
+    """Get the process-wide cache registered under name, creating it on first use
+
+    kwargs configure the cache only when it is created; later callers share
+    the existing instance.
+    """
+    with _caches_lock:
+        if name not in _caches:
+            _caches[name] = LRUCache(**kwargs)
+        return _caches[name]
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Get stats for every shared cache"""
+    with _caches_lock:
+        caches = dict(_caches)
+    return {name: cache.stats() for name, cache in caches.items()}
@@ -33,6 +33,15 @@ class EnvironmentalAnalysisService:
             }
         }
         
+        # Relative weight of each condition when scoring a time period
+        self.period_weights = {
+            'temperature': 1.0,
+            'wind_speed': 1.0,
+            'precipitation': 1.5,  # Higher weight for precipitation
+            'pressure': 0.8,
+            'humidity': 0.5
+        }
+        
     def analyze_environment(self, gmu_id: str, date: datetime) -> Dict:
         """Perform comprehensive environmental analysis"""
         # Get GMU data
@@ -83,37 +92,92 @@ class EnvironmentalAnalysisService:
     def get_optimal_times(self, gmu_id: str,
                          start_date: datetime,
                          days: int = 5) -> List[Dict]:
-        """Find optimal hunting times based on environmental conditions"""
+        """Find optimal hunting times based on environmental conditions
+        
+        Fetches the 3-hourly forecast once, scores every period in the
+        requested window in one vectorized pass and returns the high-scoring
+        periods ranked best first.
+        """
         gmu_bounds = self.gmu_service.get_gmu_bounds(gmu_id)
+        if not gmu_bounds:
+            return []
         center_lat = (gmu_bounds['north'] + gmu_bounds['south']) / 2
         center_lon = (gmu_bounds['east'] + gmu_bounds['west']) / 2
         
+        periods = self.weather_service.get_forecast_periods(center_lat, center_lon)
+        
+        # Keep each forecast period once, limited to the requested days
+        end_date = start_date + timedelta(days=days)
+        seen = set()
+        window = []
+        for period in periods:
+            timestamp = period['timestamp']
+            if timestamp in seen or not start_date <= timestamp < end_date:
+                continue
+            seen.add(timestamp)
+            window.append(period)
+            
+        scores = self._score_periods(window)
+        
         optimal_times = []
-        current_date = start_date
+        for i in np.argsort(-scores, kind='stable'):
+            if scores[i] <= 0.7:  # Only include high-scoring periods
+                break
+            analysis = self._analyze_conditions(window[i])
+            optimal_times.append({
+                "time": window[i]['timestamp'],
+                "score": float(scores[i]),
+                "conditions": analysis,
+                "recommendations": self._generate_period_recommendations(
+                    analysis
+                )
+            })
+            
+        return optimal_times
         
-        for _ in range(days):
-            day_forecast = self.weather_service.get_forecast(
-                center_lat, center_lon, days=1
+    def _score_periods(self, periods: List[Dict]) -> np.ndarray:
+        """Vectorized equivalent of _calculate_period_score(_analyze_conditions(p))"""
+        n = len(periods)
+        totals = np.zeros(n)
+        counts = np.zeros(n)
+        
+        for condition, ranges in self.optimal_conditions.items():
+            values = np.array([p.get(condition) for p in periods], dtype=float)
+            present = ~np.isnan(values)
+            ideal_min, ideal_max = ranges['ideal_range']
+            accept_min, accept_max = ranges['acceptable_range']
+            
+            ideal = (values >= ideal_min) & (values <= ideal_max)
+            acceptable = (values >= accept_min) & (values <= accept_max)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                below = 0.5 + 0.5 * (values - accept_min) / (ideal_min - accept_min)
+                above = 0.5 + 0.5 * (accept_max - values) / (accept_max - ideal_max)
+            scores = np.select(
+                [ideal, acceptable & (values < ideal_min), acceptable],
+                [1.0, below, above],
+                0.0
             )
             
-            # Analyze each 3-hour period
-            for period in day_forecast:
-                analysis = self._analyze_conditions(period)
-                score = self._calculate_period_score(analysis)
-                
-                if score > 0.7:  # Only include high-scoring periods
-                    optimal_times.append({
-                        "time": period['timestamp'],
-                        "score": score,
-                        "conditions": analysis,
-                        "recommendations": self._generate_period_recommendations(
-                            analysis
-                        )
-                    })
-                    
-            current_date += timedelta(days=1)
+            weight = self.period_weights.get(condition, 1.0)
+            totals += np.where(present, scores * weight, 0.0)
+            counts += present
             
-        return sorted(optimal_times, key=lambda x: x['score'], reverse=True)
+        # Precipitation is analysed whenever a precipitation type is reported
+        precip_types = np.array([p.get('precipitation_type') or '' for p in periods], dtype=object)
+        amounts = np.array([p.get('precipitation', 0) or 0 for p in periods], dtype=float)
+        has_precip = precip_types != ''
+        precip_scores = np.select(
+            [precip_types == 'none',
+             (precip_types == 'snow') & (amounts < 0.5),
+             (precip_types == 'rain') & (amounts < 0.1)],
+            [1.0, 0.9, 0.7],
+            0.3
+        )
+        totals += np.where(has_precip, precip_scores * self.period_weights['precipitation'], 0.0)
+        counts += has_precip
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(counts > 0, totals / counts, 0.0)
         
     def _analyze_conditions(self, weather: Dict) -> Dict:
         """Analyze specific weather conditions"""
@@ -261,17 +325,10 @@ class EnvironmentalAnalysisService:
     def _calculate_period_score(self, conditions: Dict) -> float:
         """Calculate overall score for a time period"""
         scores = []
-        weights = {
-            'temperature': 1.0,
-            'wind_speed': 1.0,
-            'precipitation': 1.5,  # Higher weight for precipitation
-            'pressure': 0.8,
-            'humidity': 0.5
-        }
         
         for condition, analysis in conditions.items():
             if isinstance(analysis, dict) and 'score' in analysis:
-                weight = weights.get(condition, 1.0)
+                weight = self.period_weights.get(condition, 1.0)
                 scores.append(analysis['score'] * weight)
                 
         return np.average(scores) if scores else 0
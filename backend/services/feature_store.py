@@ -0,0 +1,194 @@
+import os
+import uuid
+import shutil
+import logging
+from pathlib import Path
+from threading import Lock
+from typing import Iterable, Iterator, List, Optional, Set, Tuple
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+from pyarrow import fs
+
+logger = logging.getLogger(__name__)
+
+class FeatureStore:
+    """Parquet dataset of training features partitioned by GMU and month.
+
+    Rows live under root/gmu_id=<id>/month=<YYYY-MM>/ in one or more
+    Parquet files, with the row's date kept as a column. Each write adds at
+    most one file per partition it touches. Partition keys are always read
+    back as strings, so GMU ids such as '028' keep their leading zeros.
+
+    The file list is loaded once per instance and kept up to date by its
+    own writes; call refresh() to pick up files written by another process.
+    Writes go to a hidden staging directory whose files are renamed into
+    place, so readers never see a partial file. Reads memory-map the files.
+    """
+
+    PARTITION_COLUMNS = ['gmu_id', 'date']
+    WRITE_MODES = ('skip', 'append', 'overwrite')
+
+    def __init__(self, root='data/features'):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.partitioning = ds.partitioning(
+            pa.schema([('gmu_id', pa.string()), ('month', pa.string())]),
+            flavor='hive'
+        )
+        self.filesystem = fs.LocalFileSystem(use_mmap=True)
+        self._lock = Lock()
+        self.refresh()
+
+    def refresh(self):
+        """Reload the file list from disk"""
+        files = {}
+        for path in sorted(self.root.glob('gmu_id=*/month=*/*.parquet')):
+            key = (path.parent.parent.name.split('=', 1)[1], path.parent.name.split('=', 1)[1])
+            files.setdefault(key, []).append(str(path.resolve()))
+        with self._lock:
+            self._files = files
+
+    def _partition_dir(self, gmu_id: str, month: str) -> Path:
+        return self.root / f'gmu_id={gmu_id}' / f'month={month}'
+
+    def partitions(self, gmu_id: Optional[str] = None) -> Set[Tuple[str, str]]:
+        """Get the (gmu_id, month) partitions that hold data"""
+        with self._lock:
+            return {key for key in self._files if gmu_id is None or key[0] == str(gmu_id)}
+
+    def has_partition(self, gmu_id: str, date) -> bool:
+        """Whether the month holding date has data for the GMU"""
+        month = pd.Timestamp(date).strftime('%Y-%m')
+        with self._lock:
+            return (str(gmu_id), month) in self._files
+
+    def write(self, data: pd.DataFrame, mode: str = 'skip') -> int:
+        """Write rows into their (gmu_id, month) partitions
+
+        mode controls partitions that already hold data: 'skip' leaves them
+        untouched, 'append' adds another file and 'overwrite' replaces
+        their contents. Returns the number of rows written.
+        """
+        if mode not in self.WRITE_MODES:
+            raise ValueError(f"mode must be one of: {', '.join(self.WRITE_MODES)}")
+        missing = [c for c in self.PARTITION_COLUMNS if c not in data.columns]
+        if missing:
+            raise ValueError(f"Missing partition columns: {', '.join(missing)}")
+
+        data = data.assign(gmu_id=data['gmu_id'].astype(str),
+                           date=pd.to_datetime(data['date']))
+        data['month'] = data['date'].dt.strftime('%Y-%m')
+        keys = pd.MultiIndex.from_frame(data[['gmu_id', 'month']])
+        stored = keys.isin(list(self.partitions()))
+
+        if mode == 'skip':
+            data = data[~stored]
+        elif mode == 'overwrite':
+            with self._lock:
+                for key in set(keys[stored]):
+                    for old_file in self._files.pop(key):
+                        os.unlink(old_file)
+        if data.empty:
+            return 0
+
+        # Leading dot keeps the staging files out of any dataset discovery
+        staging = self.root / f'.staging-{uuid.uuid4().hex}'
+        written = []
+        try:
+            ds.write_dataset(
+                pa.Table.from_pandas(data, preserve_index=False), str(staging),
+                format='parquet', partitioning=self.partitioning,
+                basename_template=f'part-{uuid.uuid4().hex}-{{i}}.parquet'
+            )
+            for path in staging.glob('gmu_id=*/month=*/*.parquet'):
+                gmu_id = path.parent.parent.name.split('=', 1)[1]
+                month = path.parent.name.split('=', 1)[1]
+                partition = self._partition_dir(gmu_id, month)
+                partition.mkdir(parents=True, exist_ok=True)
+                os.replace(path, partition / path.name)
+                written.append(((gmu_id, month), str((partition / path.name).resolve())))
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+        with self._lock:
+            for key, path in written:
+                self._files.setdefault(key, []).append(path)
+        logger.info(f"Wrote {len(data)} feature rows to {self.root} in {len(written)} files")
+        return len(data)
+
+    def _dataset(self, gmu_ids: Optional[Iterable[str]] = None) -> Optional[ds.Dataset]:
+        """Dataset over the stored files, limited to the given GMUs"""
+        gmu_ids = None if gmu_ids is None else {str(g) for g in gmu_ids}
+        with self._lock:
+            files = [
+                path
+                for (gmu_id, _), paths in sorted(self._files.items())
+                if gmu_ids is None or gmu_id in gmu_ids
+                for path in paths
+            ]
+        if not files:
+            return None
+        return ds.dataset(
+            files, format='parquet', partitioning=self.partitioning,
+            partition_base_dir=str(self.root.resolve()), filesystem=self.filesystem
+        )
+
+    def _filter(self, start_date, end_date):
+        conditions = []
+        # The month key prunes whole partitions; the date column is exact.
+        # ISO months order the same as strings.
+        if start_date is not None:
+            start = pd.Timestamp(start_date).normalize()
+            conditions.append(ds.field('month') >= start.strftime('%Y-%m'))
+            conditions.append(ds.field('date') >= pa.scalar(start.to_pydatetime()))
+        if end_date is not None:
+            end = pd.Timestamp(end_date).normalize()
+            conditions.append(ds.field('month') <= end.strftime('%Y-%m'))
+            # Inclusive of the whole end day
+            conditions.append(ds.field('date') < pa.scalar((end + pd.Timedelta(days=1)).to_pydatetime()))
+        expression = None
+        for condition in conditions:
+            expression = condition if expression is None else expression & condition
+        return expression
+
+    def count_rows(self, gmu_ids: Optional[Iterable[str]] = None,
+                   start_date=None, end_date=None) -> int:
+        """Count stored rows from Parquet metadata, without reading data"""
+        dataset = self._dataset(gmu_ids)
+        if dataset is None:
+            return 0
+        return dataset.count_rows(filter=self._filter(start_date, end_date))
+
+    def read(self, gmu_ids: Optional[Iterable[str]] = None,
+             columns: Optional[List[str]] = None,
+             start_date=None, end_date=None) -> pd.DataFrame:
+        """Read the matching rows into one DataFrame"""
+        dataset = self._dataset(gmu_ids)
+        if dataset is None:
+            return pd.DataFrame(columns=columns)
+        table = dataset.to_table(
+            columns=self._columns(dataset, columns), filter=self._filter(start_date, end_date)
+        )
+        return table.to_pandas()
+
+    def iter_batches(self, gmu_ids: Optional[Iterable[str]] = None,
+                     columns: Optional[List[str]] = None,
+                     start_date=None, end_date=None,
+                     batch_size: int = 65536) -> Iterator[pd.DataFrame]:
+        """Stream the matching rows as DataFrames of at most batch_size rows"""
+        dataset = self._dataset(gmu_ids)
+        if dataset is None:
+            return
+        for batch in dataset.to_batches(
+            columns=self._columns(dataset, columns), filter=self._filter(start_date, end_date),
+            batch_size=batch_size
+        ):
+            if batch.num_rows:
+                yield batch.to_pandas()
+
+    def _columns(self, dataset: ds.Dataset, columns: Optional[List[str]]) -> List[str]:
+        """Requested columns; by default every stored column but the month key"""
+        if columns is not None:
+            return columns
+        return [name for name in dataset.schema.names if name != 'month']
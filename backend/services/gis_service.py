@@ -5,23 +5,42 @@ import os
 from dotenv import load_dotenv
 import geopandas as gpd
 from shapely.geometry import Point, Polygon
-from rtree import index
+from sklearn.neighbors import BallTree
+from .cache import get_cache, quantize_point
 
 load_dotenv()
 
+EARTH_RADIUS_KM = 6371.0
+
+# Relative value of each water feature type as a water source
+WATER_TYPE_WEIGHTS = {
+    'lake': 1.0,
+    'reservoir': 1.0,
+    'river': 0.8,
+    'stream': 0.6,
+    'spring': 0.6,
+    'pond': 0.4
+}
+SEASONAL_WEIGHT = 0.7
+
 class GISService:
     def __init__(self):
         self.usgs_nhd_url = "https://hydro.nationalmap.gov/arcgis/rest/services/NHDPlus_HR/MapServer"
         self.api_key = os.getenv('USGS_API_KEY')
-        self.water_features_index = None
+        self.water_tree = None
         self.water_features = None
         self.initialize_water_features()
         
+        # Hot hotspot/analysis queries overlap heavily around popular GMUs
+        self.water_cache = get_cache(
+            'gis:water',
+            max_entries=int(os.getenv('GIS_CACHE_ENTRIES', 50000)),
+            max_bytes=int(os.getenv('GIS_CACHE_BYTES', 32 * 1024 * 1024)),
+            ttl=float(os.getenv('GIS_CACHE_TTL', 3600))
+        )
+        
     def initialize_water_features(self):
         """Initialize water features from National Hydrography Dataset"""
-        # Create R-tree index for spatial querying
-        self.water_features_index = index.Index()
-        
         # Load water features from local cache or download
         cache_file = "data/water_features.geojson"
         if os.path.exists(cache_file):
@@ -29,10 +48,34 @@ class GISService:
         else:
             self.download_water_features()
             
-        # Build spatial index
-        for idx, feature in self.water_features.iterrows():
-            bounds = feature.geometry.bounds
-            self.water_features_index.insert(idx, bounds)
+        self._build_water_index()
+            
+    def _build_water_index(self):
+        """Build a haversine ball tree and per-feature attribute arrays"""
+        features = self.water_features
+        n = len(features)
+        
+        def column(name, default):
+            if name in features.columns:
+                return features[name].fillna(default).to_numpy()
+            return np.full(n, default, dtype=object)
+            
+        # Lines and polygons are indexed by a representative point on them
+        points = features.geometry.representative_point()
+        self.water_lons = points.x.to_numpy(dtype=float)
+        self.water_lats = points.y.to_numpy(dtype=float)
+        self.water_names = column('name', '')
+        self.water_types = column('type', '')
+        self.water_permanent = column('permanent', False).astype(bool)
+        self.water_seasonal = column('seasonal', False).astype(bool)
+        self.water_weights = np.array(
+            [WATER_TYPE_WEIGHTS.get(t, 1.0) for t in self.water_types], dtype=float
+        ) * np.where(self.water_seasonal, SEASONAL_WEIGHT, 1.0)
+        
+        self.water_tree = BallTree(
+            np.radians(np.column_stack([self.water_lats, self.water_lons])),
+            metric='haversine'
+        ) if n else None
     
     def download_water_features(self):
         """Download water features from USGS National Hydrography Dataset"""
@@ -81,67 +124,90 @@ class GISService:
     
     def find_water_features(self, lat: float, lon: float, radius_km: float = 5.0) -> List[Dict]:
         """Find water features within radius of a point"""
-        # Convert radius to degrees (approximate)
-        radius_deg = radius_km / 111.0  # 1 degree ≈ 111km
+        key = ('features', quantize_point(lat, lon), radius_km)
+        cached = self.water_cache.get(key)
+        if cached is None:
+            cached = self._find_water_features(lat, lon, radius_km)
+            self.water_cache[key] = cached
+        return [dict(feature) for feature in cached]
         
-        # Create bounding box for spatial query
-        bbox = (
-            lon - radius_deg,
-            lat - radius_deg,
-            lon + radius_deg,
-            lat + radius_deg
+    def _find_water_features(self, lat: float, lon: float, radius_km: float) -> List[Dict]:
+        """Query the spatial index for water features near a point"""
+        if self.water_tree is None:
+            return []
+            
+        indices, distances = self.water_tree.query_radius(
+            np.radians([[lat, lon]]),
+            r=radius_km / EARTH_RADIUS_KM,
+            return_distance=True,
+            sort_results=True
         )
         
-        # Query R-tree index
-        nearby_idx = list(self.water_features_index.intersection(bbox))
+        return [
+            {
+                'name': self.water_names[idx],
+                'type': self.water_types[idx],
+                'distance': float(distance * EARTH_RADIUS_KM),
+                'permanent': bool(self.water_permanent[idx]),
+                'seasonal': bool(self.water_seasonal[idx]),
+                'coordinates': (float(self.water_lons[idx]), float(self.water_lats[idx]))
+            }
+            for idx, distance in zip(indices[0], distances[0])
+        ]
+        
+    def find_nearest_water_features(self, lats, lons, k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """Find the k nearest water features for arrays of points
         
-        # Filter and calculate distances
-        point = Point(lon, lat)
-        features = []
+        Returns (indices, distances_km), each shaped (n_points, k), with
+        great-circle distances. Indices refer to rows of self.water_features.
+        """
+        lats = np.atleast_1d(np.asarray(lats, dtype=float))
+        lons = np.atleast_1d(np.asarray(lons, dtype=float))
+        if self.water_tree is None:
+            return (np.empty((lats.size, 0), dtype=int),
+                    np.empty((lats.size, 0), dtype=float))
+            
+        k = min(k, len(self.water_lats))
+        distances, indices = self.water_tree.query(
+            np.radians(np.column_stack([lats.ravel(), lons.ravel()])), k=k
+        )
+        return indices, distances * EARTH_RADIUS_KM
         
-        for idx in nearby_idx:
-            feature = self.water_features.iloc[idx]
-            distance = point.distance(feature.geometry) * 111.0  # Convert to km
+    def calculate_water_factors(self, lats, lons, radius_km: float = 5.0) -> np.ndarray:
+        """Calculate water availability factors for arrays of points at once"""
+        lats = np.asarray(lats, dtype=float)
+        lons = np.asarray(lons, dtype=float)
+        shape = np.broadcast(lats, lons).shape
+        if self.water_tree is None:
+            return np.zeros(shape)
             
-            if distance <= radius_km:
-                features.append({
-                    'name': feature['properties']['name'],
-                    'type': feature['properties']['type'],
-                    'distance': distance,
-                    'permanent': feature['properties']['permanent'],
-                    'seasonal': feature['properties']['seasonal'],
-                    'coordinates': feature.geometry.coords[0]
-                })
+        lats, lons = np.broadcast_arrays(lats, lons)
+        indices, distances = self.water_tree.query_radius(
+            np.radians(np.column_stack([lats.ravel(), lons.ravel()])),
+            r=radius_km / EARTH_RADIUS_KM,
+            return_distance=True
+        )
+        
+        # Flatten the ragged per-point results and sum weights per point
+        counts = np.fromiter((len(i) for i in indices), dtype=np.int64, count=len(indices))
+        point_ids = np.repeat(np.arange(len(indices)), counts)
+        feature_ids = np.concatenate(indices).astype(np.int64) if counts.any() else np.empty(0, dtype=np.int64)
+        feature_distances = np.concatenate(distances) * EARTH_RADIUS_KM if counts.any() else np.empty(0)
+        weights = self.water_weights[feature_ids] / (1.0 + feature_distances)
+        totals = np.bincount(point_ids, weights=weights, minlength=len(indices))
         
-        return sorted(features, key=lambda x: x['distance'])
+        # Combine weights with diminishing returns
+        return (1.0 - np.exp(-totals)).reshape(shape)
     
     def calculate_water_factor(self, lat: float, lon: float) -> float:
         """Calculate water availability factor for a location"""
-        features = self.find_water_features(lat, lon)
-        if not features:
-            return 0.0
-            
-        # Weight features by distance and type
-        weights = []
-        for feature in features:
-            # Base weight by distance (inverse relationship)
-            weight = 1.0 / (1.0 + feature['distance'])
-            
-            # Adjust weight by type
-            if feature['type'] in ['lake', 'reservoir']:
-                weight *= 1.0
-            elif feature['type'] == 'river':
-                weight *= 0.8
-            elif feature['type'] in ['stream', 'spring']:
-                weight *= 0.6
-            elif feature['type'] == 'pond':
-                weight *= 0.4
-                
-            # Adjust for seasonality
-            if feature['seasonal']:
-                weight *= 0.7
-                
-            weights.append(weight)
+        key = ('factor', quantize_point(lat, lon))
+        factor = self.water_cache.get(key)
+        if factor is None:
+            factor = self._calculate_water_factor(lat, lon)
+            self.water_cache[key] = factor
+        return factor
         
-        # Combine weights with diminishing returns
-        return 1.0 - np.exp(-sum(weights))
+    def _calculate_water_factor(self, lat: float, lon: float) -> float:
+        """Combine distance- and type-weighted water features into a factor"""
+        return float(self.calculate_water_factors(lat, lon))
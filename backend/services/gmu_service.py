@@ -1,25 +1,105 @@
 import json
 import os
+from threading import Lock
 from typing import Dict, List, Optional
+import numpy as np
 import geopandas as gpd
+import shapely
 from shapely.geometry import Polygon, Point
+from shapely.strtree import STRtree
 import requests
 from dotenv import load_dotenv
+from .terrain_service import TerrainService
 
 load_dotenv()
 
-class GMUService:
-    def __init__(self):
+# Samples per side used to estimate a GMU's elevation range from terrain
+ELEVATION_SAMPLE_GRID = 16
+
+class GMUDataset:
+    """GMU boundaries plus the lookup indexes built from them.
+    
+    Loaded once per process (see get_gmu_dataset) and shared read-only by
+    every GMUService, so nothing here may be mutated after construction.
+    """
+    def __init__(self, gmu_file: str = "data/gmu_boundaries.geojson"):
+        self.gmu_file = gmu_file
         self.gmu_data = None
+        self.gmu_tree = None
+        self.gmu_index = {}
+        self.all_gmus = []
+        self.gmus_by_region = {}
         self.load_gmu_data()
         
     def load_gmu_data(self):
         """Load GMU boundaries from GeoJSON file or create if not exists"""
-        gmu_file = "data/gmu_boundaries.geojson"
+        gmu_file = self.gmu_file
         if os.path.exists(gmu_file):
             self.gmu_data = gpd.read_file(gmu_file)
         else:
             self.create_gmu_data()
+        self._build_spatial_index()
+        self._build_id_index()
+            
+    def _build_spatial_index(self):
+        """Build an STRtree over GMU polygons for point-in-GMU lookups"""
+        self.gmu_properties = self.gmu_data.drop(columns='geometry').to_dict('records')
+        self.gmu_ids = np.array([props['gmu_id'] for props in self.gmu_properties], dtype=object)
+        self.gmu_tree = STRtree(np.asarray(self.gmu_data.geometry))
+        
+    def _build_id_index(self):
+        """Precompute bounds, centroid, region and elevation range per gmu_id"""
+        elevation_ranges = self._estimate_elevation_ranges()
+        # Planar centroids in lon/lat are fine at GMU scale
+        centroids = shapely.centroid(np.asarray(self.gmu_data.geometry))
+        
+        self.gmu_index = {}
+        for i, props in enumerate(self.gmu_properties):
+            elevation_min, elevation_max = elevation_ranges[i]
+            self.gmu_index[props['gmu_id']] = {
+                'gmu_id': props['gmu_id'],
+                'name': props.get('name'),
+                'region': props.get('region'),
+                'bounds': {
+                    'north': props['north'],
+                    'south': props['south'],
+                    'east': props['east'],
+                    'west': props['west'],
+                    'elevation_min': elevation_min,
+                    'elevation_max': elevation_max
+                },
+                'centroid': {
+                    'lat': float(centroids[i].y),
+                    'lon': float(centroids[i].x)
+                }
+            }
+            
+        self.all_gmus = [dict(props) for props in self.gmu_properties]
+        self.gmus_by_region = {}
+        for props in self.all_gmus:
+            self.gmus_by_region.setdefault(props.get('region'), []).append(props)
+            
+    def _estimate_elevation_ranges(self) -> List[tuple]:
+        """Elevation (min, max) per GMU, from properties or sampled terrain"""
+        props = self.gmu_properties
+        if all('elevation_min' in p and 'elevation_max' in p for p in props):
+            return [(float(p['elevation_min']), float(p['elevation_max'])) for p in props]
+            
+        # Sample every GMU's bounding box in one bulk terrain lookup
+        steps = np.linspace(0, 1, ELEVATION_SAMPLE_GRID)
+        u, v = np.meshgrid(steps, steps, indexing='ij')
+        south = np.array([p['south'] for p in props], dtype=float)[:, None]
+        north = np.array([p['north'] for p in props], dtype=float)[:, None]
+        west = np.array([p['west'] for p in props], dtype=float)[:, None]
+        east = np.array([p['east'] for p in props], dtype=float)[:, None]
+        lats = south + (north - south) * u.ravel()
+        lons = west + (east - west) * v.ravel()
+        elevation = TerrainService().get_terrain_features_batch(lats, lons)['elevation']
+        
+        return [
+            (float(p.get('elevation_min', low)), float(p.get('elevation_max', high)))
+            for p, low, high in zip(props, elevation.min(axis=1), elevation.max(axis=1))
+        ]
             
     def create_gmu_data(self):
         """Create GMU boundary data"""
@@ -82,8 +162,8 @@ class GMUService:
         
         # Create GeoDataFrame and save
         self.gmu_data = gpd.GeoDataFrame.from_features(features)
-        os.makedirs('data', exist_ok=True)
-        self.gmu_data.to_file("data/gmu_boundaries.geojson", driver='GeoJSON')
+        os.makedirs(os.path.dirname(self.gmu_file) or '.', exist_ok=True)
+        self.gmu_data.to_file(self.gmu_file, driver='GeoJSON')
     
     def _get_region(self, gmu_id: str) -> str:
         """Determine region based on GMU ID"""
@@ -97,48 +177,79 @@ class GMUService:
         else:
             return 'Southwest'
     
+_shared_dataset = None
+_dataset_lock = Lock()
+
+def get_gmu_dataset() -> GMUDataset:
+    """Get the process-wide GMU dataset, loading it on first use"""
+    global _shared_dataset
+    if _shared_dataset is None:
+        with _dataset_lock:
+            if _shared_dataset is None:
+                _shared_dataset = GMUDataset()
+    return _shared_dataset
+
+class GMUService:
+    def __init__(self, dataset: Optional[GMUDataset] = None):
+        # Every service shares one dataset instead of re-reading the GeoJSON
+        self.dataset = dataset or get_gmu_dataset()
+        
+    @property
+    def gmu_data(self):
+        return self.dataset.gmu_data
+        
     def get_gmu_bounds(self, gmu_id: str) -> Optional[Dict]:
         """Get boundary coordinates for a GMU"""
-        if self.gmu_data is None:
+        entry = self.dataset.gmu_index.get(gmu_id)
+        if entry is None:
             return None
-            
-        gmu = self.gmu_data[self.gmu_data['properties'].apply(lambda x: x['gmu_id'] == gmu_id)]
-        if len(gmu) == 0:
+        return dict(entry['bounds'])
+        
+    def get_gmu_info(self, gmu_id: str) -> Optional[Dict]:
+        """Get precomputed bounds, centroid, region and elevation range for a GMU"""
+        entry = self.dataset.gmu_index.get(gmu_id)
+        if entry is None:
             return None
-            
-        props = gmu.iloc[0]['properties']
         return {
-            'north': props['north'],
-            'south': props['south'],
-            'east': props['east'],
-            'west': props['west']
+            **entry,
+            'bounds': dict(entry['bounds']),
+            'centroid': dict(entry['centroid'])
         }
     
     def get_gmu_by_location(self, lat: float, lon: float) -> Optional[Dict]:
         """Find GMU containing a point"""
-        if self.gmu_data is None:
+        if self.dataset.gmu_data is None:
+            return None
+            
+        matches = self.dataset.gmu_tree.query(Point(lon, lat), predicate='within')
+        if len(matches) == 0:
             return None
+        # Overlaps resolve to the first GMU in file order
+        return dict(self.dataset.gmu_properties[matches.min()])
+        
+    def get_gmus_for_points(self, lats, lons) -> List[Optional[str]]:
+        """Find the GMU id containing each of many points (None if outside all)"""
+        lats = np.atleast_1d(np.asarray(lats, dtype=float))
+        lons = np.atleast_1d(np.asarray(lons, dtype=float))
+        gmu_ids = np.full(lats.size, None, dtype=object)
+        if self.dataset.gmu_data is None or lats.size == 0:
+            return gmu_ids.tolist()
             
-        point = Point(lon, lat)
-        for _, gmu in self.gmu_data.iterrows():
-            if gmu.geometry.contains(point):
-                return gmu['properties']
-        return None
+        points = shapely.points(lons.ravel(), lats.ravel())
+        point_idx, gmu_idx = self.dataset.gmu_tree.query(points, predicate='within')
+        
+        # Keep the first GMU in file order for points inside overlapping GMUs
+        order = np.lexsort((gmu_idx, point_idx))
+        point_idx = point_idx[order]
+        gmu_idx = gmu_idx[order]
+        first = np.r_[True, point_idx[1:] != point_idx[:-1]] if point_idx.size else point_idx.astype(bool)
+        gmu_ids[point_idx[first]] = self.dataset.gmu_ids[gmu_idx[first]]
+        return gmu_ids.tolist()
     
     def get_all_gmus(self) -> List[Dict]:
         """Get list of all GMUs"""
-        if self.gmu_data is None:
-            return []
-            
-        return [gmu['properties'] for _, gmu in self.gmu_data.iterrows()]
+        return [dict(props) for props in self.dataset.all_gmus]
     
     def get_gmus_by_region(self, region: str) -> List[Dict]:
         """Get list of GMUs in a region"""
-        if self.gmu_data is None:
-            return []
-            
-        return [
-            gmu['properties'] 
-            for _, gmu in self.gmu_data.iterrows() 
-            if gmu['properties']['region'] == region
-        ]
+        return [dict(props) for props in self.dataset.gmus_by_region.get(region, [])]
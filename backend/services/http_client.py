@@ -0,0 +1,84 @@
+import logging
+from concurrent.futures import Future
+from threading import Lock
+from typing import Any, Dict, Hashable, Optional
+import requests
+from requests.adapters import HTTPAdapter
+from .cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+class CachedHTTPClient:
+    """Pooled JSON GET client with a TTL response cache and request coalescing.
+
+    One keep-alive requests.Session is shared by all callers. Successful
+    responses are cached under a caller-supplied key; concurrent requests
+    for a key that is already being fetched wait for that fetch instead of
+    issuing their own, so a burst of identical requests costs one upstream
+    call.
+    """
+
+    def __init__(self, timeout: float = 10.0, ttl: float = 600.0,
+                 max_entries: int = 5000, pool_size: int = 20):
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.cache = LRUCache(max_entries=max_entries, ttl=ttl)
+        self._in_flight: Dict[Hashable, Future] = {}
+        self._in_flight_lock = Lock()
+        self.upstream_calls = 0
+        self.coalesced = 0
+
+    def get_json(self, key: Hashable, url: str,
+                 params: Optional[Dict] = None) -> Optional[Any]:
+        """Get the JSON body for url, or None if the request fails"""
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        with self._in_flight_lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._in_flight[key] = future
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return future.result()
+
+        data = None
+        try:
+            data = self._fetch(url, params)
+            if data is not None:
+                self.cache.set(key, data)
+        finally:
+            with self._in_flight_lock:
+                del self._in_flight[key]
+            future.set_result(data)
+        return data
+
+    def _fetch(self, url: str, params: Optional[Dict]) -> Optional[Any]:
+        self.upstream_calls += 1
+        try:
+            response = self.session.get(url, params=params, timeout=self.timeout)
+        except requests.RequestException as e:
+            logger.warning(f"Request to {url} failed: {e}")
+            return None
+        if response.status_code != 200:
+            return None
+        try:
+            return response.json()
+        except ValueError:
+            logger.warning(f"Invalid JSON from {url}")
+            return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'upstream_calls': self.upstream_calls,
+            'coalesced': self.coalesced,
+            'cache': self.cache.stats()
+        }
@@ -6,14 +6,51 @@ from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_squared_error, r2_score
 import joblib
 from datetime import datetime, timedelta
-from typing import Dict, List, Tuple, Optional
+from typing import Any, Dict, List, Mapping, Tuple, Optional, Union
 import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from .training_config import FitProfile, TrainingConfig
+from .uncertainty import ensemble_confidence
+
+ColumnarData = Union[pd.DataFrame, Mapping[str, Any]]
 
 class MLService:
-    def __init__(self):
+    FEATURES = {
+        'movement': [
+            'time_of_day', 'day_of_week', 'month', 'temperature',
+            'wind_speed', 'precipitation', 'pressure', 'cloud_cover',
+            'terrain_type', 'elevation', 'animal_type'
+        ],
+        'behavior': [
+            'time_of_day', 'day_of_week', 'month', 'temperature',
+            'elevation', 'animal_type', 'season', 'lunar_phase'
+        ],
+        'success': [
+            'time_of_day', 'day_of_week', 'month', 'temperature',
+            'wind_speed', 'precipitation', 'pressure', 'cloud_cover',
+            'terrain_type', 'elevation', 'animal_type', 'behavior_factor'
+        ]
+    }
+
+    CATEGORICAL_FEATURES = {
+        'movement': ['terrain_type', 'animal_type'],
+        'behavior': ['animal_type', 'season'],
+        'success': ['terrain_type', 'animal_type']
+    }
+
+    TARGETS = {
+        'movement': 'movement_vector',
+        'behavior': 'behavior_factor',
+        'success': 'success_rate'
+    }
+
+    def __init__(self, training_config: Optional[TrainingConfig] = None):
         self.models_dir = 'models'
+        self.training_config = training_config or TrainingConfig.from_env()
         self.scalers = {}
         self.label_encoders = {}
+        self._encoding_tables = {}
         self.models = {
             'movement': None,
             'behavior': None,
@@ -50,99 +87,164 @@ class MLService:
         if model_type in self.label_encoders:
             joblib.dump(self.label_encoders[model_type], encoder_path)
 
-    def train_movement_model(self, historical_data: pd.DataFrame):
-        """Train movement pattern prediction model"""
-        # Prepare features
-        features = [
-            'time_of_day', 'day_of_week', 'month', 'temperature',
-            'wind_speed', 'precipitation', 'pressure', 'cloud_cover',
-            'terrain_type', 'elevation', 'animal_type'
-        ]
-        target = 'movement_vector'
-
-        # Encode categorical variables
-        self.label_encoders['movement'] = LabelEncoder()
-        historical_data['terrain_type'] = self.label_encoders['movement'].fit_transform(
-            historical_data['terrain_type']
-        )
-        historical_data['animal_type'] = self.label_encoders['movement'].fit_transform(
-            historical_data['animal_type']
-        )
-
-        # Scale numerical features
-        self.scalers['movement'] = StandardScaler()
-        X = self.scalers['movement'].fit_transform(historical_data[features])
-        y = historical_data[target]
-
-        # Train model
-        self.models['movement'] = GradientBoostingRegressor(
-            n_estimators=100,
-            learning_rate=0.1,
-            max_depth=5
+    @classmethod
+    def _fit_encoders(cls, model_type: str, historical_data: pd.DataFrame):
+        """Fit one LabelEncoder per categorical column; returns an encoded copy and the encoders"""
+        encoders = {}
+        data = historical_data.copy()
+        for column in cls.CATEGORICAL_FEATURES[model_type]:
+            encoders[column] = LabelEncoder()
+            data[column] = encoders[column].fit_transform(data[column])
+        return data, encoders
+
+    def _get_encoding_tables(self, model_type: str) -> Dict[str, pd.Index]:
+        """Get label -> code lookup tables for a model's categorical columns"""
+        tables = self._encoding_tables.get(model_type)
+        if tables is None:
+            encoders = self.label_encoders[model_type]
+            tables = {}
+            for column in self.CATEGORICAL_FEATURES[model_type]:
+                # Older artifacts share one encoder across every column
+                encoder = encoders[column] if isinstance(encoders, dict) else encoders
+                tables[column] = pd.Index(encoder.classes_)
+            self._encoding_tables[model_type] = tables
+        return tables
+
+    def _prepare_features(self, model_type: str, data: ColumnarData) -> np.ndarray:
+        """Encode and scale a columnar batch of scenarios in one pass
+
+        data maps each feature name to a sequence of values; scalar values
+        are repeated for every row.
+        """
+        features = self.FEATURES[model_type]
+        missing = [name for name in features if name not in data]
+        if missing:
+            raise ValueError(f"Missing feature columns: {', '.join(missing)}")
+
+        lengths = {np.size(data[name]) for name in features if np.ndim(data[name]) > 0}
+        if len(lengths) > 1:
+            raise ValueError("All feature columns must have the same length")
+        n_rows = lengths.pop() if lengths else 1
+
+        tables = self._get_encoding_tables(model_type)
+        columns = {}
+        for name in features:
+            values = np.asarray(data[name])
+            if name in tables:
+                values = np.broadcast_to(values, (n_rows,))
+                codes = tables[name].get_indexer(values)
+                if (codes < 0).any():
+                    unknown = sorted({str(v) for v in values[codes < 0]})
+                    raise ValueError(f"Unknown {name} value(s): {', '.join(unknown)}")
+                columns[name] = codes
+            else:
+                columns[name] = np.broadcast_to(values.astype(float), (n_rows,))
+
+        X = pd.DataFrame(columns, columns=features)
+        scaler = self.scalers[model_type]
+        if not hasattr(scaler, 'feature_names_in_'):
+            X = X.to_numpy()
+        return scaler.transform(X)
+
+    def _new_model(self, model_type: str):
+        """Create an unfitted estimator for a model type"""
+        if model_type == 'movement':
+            return GradientBoostingRegressor(
+                n_estimators=100,
+                learning_rate=0.1,
+                max_depth=5
+            )
+        if model_type == 'behavior':
+            return RandomForestRegressor(
+                n_estimators=100,
+                max_depth=10
+            )
+        return RandomForestRegressor(
+            n_estimators=200,
+            max_depth=15
         )
-        self.models['movement'].fit(X, y)
-        self._save_model('movement')
-
-    def train_behavior_model(self, historical_data: pd.DataFrame):
-        """Train animal behavior prediction model"""
-        features = [
-            'time_of_day', 'day_of_week', 'month', 'temperature',
-            'elevation', 'animal_type', 'season', 'lunar_phase'
-        ]
-        target = 'behavior_factor'
 
+    @classmethod
+    def _fit_model(cls, model_type: str, historical_data: pd.DataFrame,
+                   model, config: TrainingConfig):
+        """Encode, scale and fit one model; touches no instance state so it
+        can run in a worker process"""
         # Encode categorical variables
-        self.label_encoders['behavior'] = LabelEncoder()
-        historical_data['animal_type'] = self.label_encoders['behavior'].fit_transform(
-            historical_data['animal_type']
-        )
-        historical_data['season'] = self.label_encoders['behavior'].fit_transform(
-            historical_data['season']
-        )
+        data, encoders = cls._fit_encoders(model_type, historical_data)
 
         # Scale numerical features
-        self.scalers['behavior'] = StandardScaler()
-        X = self.scalers['behavior'].fit_transform(historical_data[features])
-        y = historical_data[target]
+        scaler = StandardScaler()
+        X = scaler.fit_transform(data[cls.FEATURES[model_type]])
+        y = data[cls.TARGETS[model_type]]
 
         # Train model
-        self.models['behavior'] = RandomForestRegressor(
-            n_estimators=100,
-            max_depth=10
+        profile = config.fit(model, X, y, name=model_type)
+        return model, scaler, encoders, profile
+
+    def _install_model(self, model_type: str, model, scaler, encoders,
+                       profile: FitProfile) -> FitProfile:
+        """Make a freshly fitted model current and save it"""
+        self.models[model_type] = model
+        self.scalers[model_type] = scaler
+        self.label_encoders[model_type] = encoders
+        self._encoding_tables.pop(model_type, None)
+        self._save_model(model_type)
+        return profile
+
+    def _train_model(self, model_type: str, historical_data: pd.DataFrame) -> FitProfile:
+        fitted = self._fit_model(
+            model_type, historical_data, self._new_model(model_type), self.training_config
         )
-        self.models['behavior'].fit(X, y)
-        self._save_model('behavior')
+        return self._install_model(model_type, *fitted)
 
-    def train_success_model(self, historical_data: pd.DataFrame):
-        """Train hunting success prediction model"""
-        features = [
-            'time_of_day', 'day_of_week', 'month', 'temperature',
-            'wind_speed', 'precipitation', 'pressure', 'cloud_cover',
-            'terrain_type', 'elevation', 'animal_type', 'behavior_factor'
-        ]
-        target = 'success_rate'
-
-        # Encode categorical variables
-        self.label_encoders['success'] = LabelEncoder()
-        historical_data['terrain_type'] = self.label_encoders['success'].fit_transform(
-            historical_data['terrain_type']
-        )
-        historical_data['animal_type'] = self.label_encoders['success'].fit_transform(
-            historical_data['animal_type']
-        )
+    def train_movement_model(self, historical_data: pd.DataFrame) -> FitProfile:
+        """Train movement pattern prediction model"""
+        return self._train_model('movement', historical_data)
 
-        # Scale numerical features
-        self.scalers['success'] = StandardScaler()
-        X = self.scalers['success'].fit_transform(historical_data[features])
-        y = historical_data[target]
+    def train_behavior_model(self, historical_data: pd.DataFrame) -> FitProfile:
+        """Train animal behavior prediction model"""
+        return self._train_model('behavior', historical_data)
 
-        # Train model
-        self.models['success'] = RandomForestRegressor(
-            n_estimators=200,
-            max_depth=15
-        )
-        self.models['success'].fit(X, y)
-        self._save_model('success')
+    def train_success_model(self, historical_data: pd.DataFrame) -> FitProfile:
+        """Train hunting success prediction model"""
+        return self._train_model('success', historical_data)
+
+    def train_models(self,
+                     historical_data: Union[pd.DataFrame, Dict[str, pd.DataFrame]],
+                     model_types: Optional[List[str]] = None) -> Dict[str, FitProfile]:
+        """Train several models, returning a wall time/memory profile for each
+
+        historical_data is one frame holding every model's columns, or a
+        frame per model type. With training_config.parallel_models the
+        models are fitted at the same time in worker processes, each with
+        an equal share of the cores.
+        """
+        model_types = model_types or list(self.models)
+        if isinstance(historical_data, pd.DataFrame):
+            historical_data = {model_type: historical_data for model_type in model_types}
+
+        if not self.training_config.parallel_models or len(model_types) < 2:
+            return {
+                model_type: self._train_model(model_type, historical_data[model_type])
+                for model_type in model_types
+            }
+
+        config = self.training_config.for_parallel_models(len(model_types))
+        with ProcessPoolExecutor(
+            max_workers=len(model_types),
+            mp_context=multiprocessing.get_context('spawn')
+        ) as pool:
+            futures = {
+                model_type: pool.submit(
+                    MLService._fit_model, model_type, historical_data[model_type],
+                    self._new_model(model_type), config
+                )
+                for model_type in model_types
+            }
+            return {
+                model_type: self._install_model(model_type, *future.result())
+                for model_type, future in futures.items()
+            }
 
     def predict_movement(self,
                         time_of_day: float,
@@ -152,38 +254,23 @@ class MLService:
                         terrain_data: Dict,
                         animal_type: str) -> Dict:
         """Predict animal movement patterns"""
-        if not self.models['movement']:
-            raise ValueError("Movement model not trained")
-
-        # Prepare features
-        features = np.array([[
-            time_of_day,
-            day_of_week,
-            month,
-            weather_data['temperature'],
-            weather_data['wind_speed'],
-            weather_data['precipitation'],
-            weather_data['pressure'],
-            weather_data['cloud_cover'],
-            self.label_encoders['movement'].transform([terrain_data['type']])[0],
-            terrain_data['elevation'],
-            self.label_encoders['movement'].transform([animal_type])[0]
-        ]])
-
-        # Scale features
-        features_scaled = self.scalers['movement'].transform(features)
-
-        # Make prediction
-        movement_vector = self.models['movement'].predict(features_scaled)[0]
-        confidence = self._calculate_confidence(
-            self.models['movement'],
-            features_scaled,
-            movement_vector
-        )
+        result = self.predict_movement_batch({
+            'time_of_day': time_of_day,
+            'day_of_week': day_of_week,
+            'month': month,
+            'temperature': weather_data['temperature'],
+            'wind_speed': weather_data['wind_speed'],
+            'precipitation': weather_data['precipitation'],
+            'pressure': weather_data['pressure'],
+            'cloud_cover': weather_data['cloud_cover'],
+            'terrain_type': terrain_data['type'],
+            'elevation': terrain_data['elevation'],
+            'animal_type': animal_type
+        })
 
         return {
-            'movement_vector': movement_vector,
-            'confidence': confidence
+            'movement_vector': result['movement_vector'][0],
+            'confidence': float(result['confidence'][0])
         }
 
     def predict_behavior(self,
@@ -196,35 +283,20 @@ class MLService:
                         season: str,
                         lunar_phase: float) -> Dict:
         """Predict animal behavior factors"""
-        if not self.models['behavior']:
-            raise ValueError("Behavior model not trained")
-
-        # Prepare features
-        features = np.array([[
-            time_of_day,
-            day_of_week,
-            month,
-            temperature,
-            elevation,
-            self.label_encoders['behavior'].transform([animal_type])[0],
-            self.label_encoders['behavior'].transform([season])[0],
-            lunar_phase
-        ]])
-
-        # Scale features
-        features_scaled = self.scalers['behavior'].transform(features)
-
-        # Make prediction
-        behavior_factor = self.models['behavior'].predict(features_scaled)[0]
-        confidence = self._calculate_confidence(
-            self.models['behavior'],
-            features_scaled,
-            behavior_factor
-        )
+        result = self.predict_behavior_batch({
+            'time_of_day': time_of_day,
+            'day_of_week': day_of_week,
+            'month': month,
+            'temperature': temperature,
+            'elevation': elevation,
+            'animal_type': animal_type,
+            'season': season,
+            'lunar_phase': lunar_phase
+        })
 
         return {
-            'behavior_factor': behavior_factor,
-            'confidence': confidence
+            'behavior_factor': result['behavior_factor'][0],
+            'confidence': float(result['confidence'][0])
         }
 
     def predict_success(self,
@@ -236,64 +308,63 @@ class MLService:
                        animal_type: str,
                        behavior_factor: float) -> Dict:
         """Predict hunting success probability"""
+        result = self.predict_success_batch({
+            'time_of_day': time_of_day,
+            'day_of_week': day_of_week,
+            'month': month,
+            'temperature': weather_data['temperature'],
+            'wind_speed': weather_data['wind_speed'],
+            'precipitation': weather_data['precipitation'],
+            'pressure': weather_data['pressure'],
+            'cloud_cover': weather_data['cloud_cover'],
+            'terrain_type': terrain_data['type'],
+            'elevation': terrain_data['elevation'],
+            'animal_type': animal_type,
+            'behavior_factor': behavior_factor
+        })
+
+        return {
+            'success_rate': result['success_rate'][0],
+            'confidence': float(result['confidence'][0])
+        }
+
+    def predict_movement_batch(self, data: ColumnarData) -> Dict[str, np.ndarray]:
+        """Predict movement vectors for a columnar batch of scenarios"""
+        if not self.models['movement']:
+            raise ValueError("Movement model not trained")
+
+        movement_vector, confidence = self._predict_batch('movement', data)
+        return {'movement_vector': movement_vector, 'confidence': confidence}
+
+    def predict_behavior_batch(self, data: ColumnarData) -> Dict[str, np.ndarray]:
+        """Predict behavior factors for a columnar batch of scenarios"""
+        if not self.models['behavior']:
+            raise ValueError("Behavior model not trained")
+
+        behavior_factor, confidence = self._predict_batch('behavior', data)
+        return {'behavior_factor': behavior_factor, 'confidence': confidence}
+
+    def predict_success_batch(self, data: ColumnarData) -> Dict[str, np.ndarray]:
+        """Predict success rates for a columnar batch of scenarios"""
         if not self.models['success']:
             raise ValueError("Success model not trained")
 
-        # Prepare features
-        features = np.array([[
-            time_of_day,
-            day_of_week,
-            month,
-            weather_data['temperature'],
-            weather_data['wind_speed'],
-            weather_data['precipitation'],
-            weather_data['pressure'],
-            weather_data['cloud_cover'],
-            self.label_encoders['success'].transform([terrain_data['type']])[0],
-            terrain_data['elevation'],
-            self.label_encoders['success'].transform([animal_type])[0],
-            behavior_factor
-        ]])
-
-        # Scale features
-        features_scaled = self.scalers['success'].transform(features)
-
-        # Make prediction
-        success_rate = self.models['success'].predict(features_scaled)[0]
-        confidence = self._calculate_confidence(
-            self.models['success'],
-            features_scaled,
-            success_rate
-        )
+        success_rate, confidence = self._predict_batch('success', data)
+        return {'success_rate': success_rate, 'confidence': confidence}
 
-        return {
-            'success_rate': success_rate,
-            'confidence': confidence
-        }
+    def _predict_batch(self, model_type: str, data: ColumnarData) -> Tuple[np.ndarray, np.ndarray]:
+        """One encode/scale pass, one predict and one confidence pass for a batch"""
+        model = self.models[model_type]
+        features_scaled = self._prepare_features(model_type, data)
+        predictions = model.predict(features_scaled)
+        confidence = self._calculate_confidence(model, features_scaled)
+        return predictions, confidence
 
     def _calculate_confidence(self,
                             model,
-                            features: np.ndarray,
-                            prediction: float) -> float:
-        """Calculate confidence score for a prediction"""
-        if hasattr(model, 'predict_proba'):
-            # For models that support probability estimation
-            probas = model.predict_proba(features)
-            confidence = np.max(probas)
-        else:
-            # For models without probability estimation,
-            # use the standard deviation of predictions from individual trees
-            if isinstance(model, (RandomForestRegressor, GradientBoostingRegressor)):
-                predictions = np.array([
-                    tree.predict(features)
-                    for tree in model.estimators_
-                ])
-                confidence = 1.0 - min(1.0, np.std(predictions))
-            else:
-                # Default confidence based on feature similarity
-                confidence = 0.8  # Base confidence
-
-        return float(confidence)
+                            features: np.ndarray) -> np.ndarray:
+        """Calculate confidence scores for a batch of predictions"""
+        return ensemble_confidence(model, features)
 
     def get_feature_importance(self, model_type: str) -> Dict[str, float]:
         """Get feature importance for a specific model"""
@@ -304,24 +375,7 @@ class MLService:
         if not hasattr(model, 'feature_importances_'):
             raise ValueError(f"Model {model_type} doesn't support feature importance")
 
-        feature_names = {
-            'movement': [
-                'time_of_day', 'day_of_week', 'month', 'temperature',
-                'wind_speed', 'precipitation', 'pressure', 'cloud_cover',
-                'terrain_type', 'elevation', 'animal_type'
-            ],
-            'behavior': [
-                'time_of_day', 'day_of_week', 'month', 'temperature',
-                'elevation', 'animal_type', 'season', 'lunar_phase'
-            ],
-            'success': [
-                'time_of_day', 'day_of_week', 'month', 'temperature',
-                'wind_speed', 'precipitation', 'pressure', 'cloud_cover',
-                'terrain_type', 'elevation', 'animal_type', 'behavior_factor'
-            ]
-        }
-
         return dict(zip(
-            feature_names[model_type],
+            self.FEATURES[model_type],
             model.feature_importances_
         ))
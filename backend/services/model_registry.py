@@ -0,0 +1,72 @@
+import os
+import time
+import logging
+from pathlib import Path
+from threading import Lock
+from typing import Any, Callable, Dict, NamedTuple, Optional
+import joblib
+
+logger = logging.getLogger(__name__)
+
+class _RegistryEntry(NamedTuple):
+    model: Any
+    mtime_ns: int
+    size: int
+    checked_at: float
+
+class ModelRegistry:
+    """Process-wide cache of deserialized models keyed by artifact path.
+
+    Each artifact is loaded once per worker and shared read-only across
+    requests. When the file on disk changes the new model is loaded and
+    swapped in with a single reference assignment, so readers always see
+    either the old or the new model, never a partially loaded one.
+    """
+
+    def __init__(self, check_interval: float = 5.0):
+        self.check_interval = check_interval
+        self._entries: Dict[str, _RegistryEntry] = {}
+        self._load_lock = Lock()
+
+    def get(self, path, loader: Callable[[str], Any] = joblib.load) -> Any:
+        """Get the model stored at path, loading or reloading it if needed"""
+        key = str(Path(path).resolve())
+        entry = self._entries.get(key)
+        now = time.monotonic()
+
+        # Fast path: recently verified, no stat() and no lock
+        if entry is not None and now - entry.checked_at < self.check_interval:
+            return entry.model
+
+        with self._load_lock:
+            entry = self._entries.get(key)
+            stat = os.stat(key)
+            if (entry is not None and entry.mtime_ns == stat.st_mtime_ns
+                    and entry.size == stat.st_size):
+                self._entries[key] = entry._replace(checked_at=now)
+                return entry.model
+
+            model = loader(key)
+            self._entries[key] = _RegistryEntry(
+                model, stat.st_mtime_ns, stat.st_size, now
+            )
+            logger.info(f"{'Reloaded' if entry else 'Loaded'} model from {key}")
+            return model
+
+    def peek(self, path) -> Optional[Any]:
+        """Return the cached model for path without touching the disk"""
+        entry = self._entries.get(str(Path(path).resolve()))
+        return entry.model if entry else None
+
+    def invalidate(self, path=None):
+        """Drop one cached model, or all of them when no path is given"""
+        with self._load_lock:
+            if path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(str(Path(path).resolve()), None)
+
+# Shared by every predictor in the worker process
+model_registry = ModelRegistry(
+    check_interval=float(os.getenv('MODEL_RELOAD_INTERVAL', 5.0))
+)
@@ -5,6 +5,9 @@ from .animal_behavior_service import AnimalBehaviorService
 from .weather_service import WeatherService
 from .gmu_service import GMUService
 
+COMPASS_POINTS = ['N', 'NNE', 'NE', 'ENE', 'E', 'ESE', 'SE', 'SSE',
+                  'S', 'SSW', 'SW', 'WSW', 'W', 'WNW', 'NW', 'NNW']
+
 class MovementPatternService:
     def __init__(self):
         self.behavior_service = AnimalBehaviorService()
@@ -100,216 +103,207 @@ class MovementPatternService:
             animal_type, date, (gmu_bounds['elevation_min'] + gmu_bounds['elevation_max']) / 2
         )
         
-        # Determine primary activity based on time and conditions
-        activity_type = self._determine_primary_activity(
-            date, behavior_factors, weather_conditions
-        )
-        
-        # Get terrain preferences for current activity
-        terrain_prefs = self.terrain_preferences[animal_type][activity_type]
-        
-        # Adjust preferences based on conditions
-        adjusted_prefs = self._adjust_terrain_preferences(
-            terrain_prefs,
-            weather_conditions,
-            behavior_factors
-        )
-        
-        # Calculate movement vectors
-        movement_vectors = self._calculate_movement_vectors(
-            activity_type,
-            adjusted_prefs,
-            weather_conditions
-        )
-        
-        return {
-            "current_time": date.strftime("%Y-%m-%d %H:%M"),
-            "animal_type": animal_type,
-            "primary_activity": activity_type,
-            "behavior_factors": behavior_factors,
-            "terrain_preferences": adjusted_prefs,
-            "movement_vectors": movement_vectors,
-            "confidence_score": self._calculate_confidence_score(
-                behavior_factors,
-                weather_conditions
-            )
+        weather = {
+            'temperature': np.array([weather_conditions['temperature']], dtype=float),
+            'wind_speed': np.array([weather_conditions['wind_speed']], dtype=float),
+            'precipitation_type': np.array([weather_conditions.get('precipitation_type')], dtype=object),
+            'wind_direction': np.array([weather_conditions.get('wind_direction', 'N')], dtype=object)
         }
+        behavior = {name: np.array([value]) for name, value in behavior_factors.items()}
+        
+        return self._predict_patterns(animal_type, [date], behavior, weather)[0]
         
     def predict_daily_pattern(self,
                             animal_type: str,
                             gmu_id: str,
                             date: datetime) -> List[Dict]:
-        """Predict movement patterns throughout the day"""
-        predictions = []
+        """Predict movement patterns throughout the day
         
-        # Get weather forecast
+        Resolves the GMU and forecast once, then classifies activity, adjusts
+        terrain preferences and computes movement vectors for all 24 hours
+        as arrays.
+        """
         gmu_bounds = self.gmu_service.get_gmu_bounds(gmu_id)
+        if not gmu_bounds:
+            return {"error": "GMU not found"}
+            
+        # Get weather forecast
         center_lat = (gmu_bounds['north'] + gmu_bounds['south']) / 2
         center_lon = (gmu_bounds['east'] + gmu_bounds['west']) / 2
-        weather_forecast = self.weather_service.get_forecast(center_lat, center_lon)
+        weather_forecast = self.weather_service.get_forecast_periods(center_lat, center_lon)
         
-        # Predict patterns for each hour
-        for hour in range(24):
-            time = date.replace(hour=hour)
-            weather = self._interpolate_weather(weather_forecast, time)
-            
-            prediction = self.predict_movement_patterns(
-                animal_type, gmu_id, time, weather
-            )
-            predictions.append(prediction)
-            
-        return predictions
+        times = [date.replace(hour=hour) for hour in range(24)]
+        weather = self._interpolate_weather(weather_forecast, times)
         
-    def _determine_primary_activity(self,
-                                  time: datetime,
-                                  behavior_factors: Dict,
-                                  weather: Dict) -> str:
-        """Determine the primary activity based on time and conditions"""
-        hour = time.hour
+        # All 24 hourly behavior factors in one vectorized call
+        elevation = (gmu_bounds['elevation_min'] + gmu_bounds['elevation_max']) / 2
+        behavior_frame = self.behavior_service.get_behavior_factors_batch(
+            animal_type, times, elevation
+        )
+        behavior = {name: behavior_frame[name].to_numpy() for name in behavior_frame.columns}
         
-        # Early morning/evening: Likely feeding
-        if (5 <= hour <= 9) or (17 <= hour <= 21):
-            return 'feeding'
-            
-        # Middle of day: Likely bedding
-        if 10 <= hour <= 16:
-            # Unless it's breeding season and weather is good
-            if (behavior_factors['breeding_factor'] > 0.7 and
-                weather['temperature'] < 70 and
-                weather['wind_speed'] < 15):
-                return 'traveling'
-            return 'bedding'
-            
-        # Night: Mix of feeding and bedding
-        return 'feeding' if hour in [22, 23, 0, 1] else 'bedding'
+        return self._predict_patterns(animal_type, times, behavior, weather)
         
-    def _adjust_terrain_preferences(self,
-                                  base_prefs: Dict[str, float],
-                                  weather: Dict,
-                                  behavior: Dict) -> Dict[str, float]:
-        """Adjust terrain preferences based on conditions"""
-        adjusted = base_prefs.copy()
+    def _predict_patterns(self,
+                        animal_type: str,
+                        times: List[datetime],
+                        behavior: Dict[str, np.ndarray],
+                        weather: Dict[str, np.ndarray]) -> List[Dict]:
+        """Build a movement prediction for each time from per-time arrays of
+        behavior factors and weather"""
+        hours = np.array([time.hour for time in times])
+        activities = self._determine_primary_activities(hours, behavior, weather)
+        terrain_types, preferences = self._adjust_terrain_preference_matrix(
+            animal_type, activities, weather, behavior
+        )
+        ranges = self._calculate_movement_ranges(activities, weather)
+        directions = self._calculate_movement_directions(weather['wind_direction'], activities)
+        confidence = self._calculate_confidence_scores(behavior, weather)
         
-        # Weather adjustments
-        if weather['temperature'] > 80:
-            # Prefer cooler, covered areas
-            adjusted['forest'] *= 1.2
-            adjusted['meadow'] *= 0.8
-            
-        if weather['wind_speed'] > 15:
-            # Prefer sheltered areas
-            adjusted['forest'] *= 1.3
-            adjusted['forest_edge'] *= 1.1
-            adjusted['meadow'] *= 0.7
-            
-        if weather.get('precipitation_type') == 'rain':
-            # Prefer covered areas
-            adjusted['forest'] *= 1.2
-            adjusted['meadow'] *= 0.8
-            
-        # Behavior adjustments
-        if behavior['breeding_factor'] > 0.5:
-            # Prefer more open areas during breeding
-            adjusted['meadow'] *= 1.2
-            adjusted['forest_edge'] *= 1.1
-            
-        if behavior['migration_factor'] > 0.5:
-            # Prefer travel corridors during migration
-            adjusted['forest_edge'] *= 1.2
-            adjusted['meadow'] *= 1.1
+        predictions = []
+        for i, time in enumerate(times):
+            activity = activities[i]
+            # Report preferences in the same key order as the base table
+            prefs = dict(zip(terrain_types, preferences[i]))
+            terrain_prefs = {
+                k: float(prefs[k]) for k in self.terrain_preferences[animal_type][activity]
+            }
+            predictions.append({
+                "current_time": time.strftime("%Y-%m-%d %H:%M"),
+                "animal_type": animal_type,
+                "primary_activity": activity,
+                "behavior_factors": {name: float(values[i]) for name, values in behavior.items()},
+                "terrain_preferences": terrain_prefs,
+                "movement_vectors": {
+                    'range': {'min': float(ranges[i, 0]), 'max': float(ranges[i, 1])},
+                    'direction': directions[i],
+                    'terrain_preference_order': sorted(
+                        terrain_prefs.items(), key=lambda x: x[1], reverse=True
+                    )
+                },
+                "confidence_score": float(confidence[i])
+            })
             
-        # Normalize preferences
-        total = sum(adjusted.values())
-        return {k: v/total for k, v in adjusted.items()}
+        return predictions
         
-    def _calculate_movement_vectors(self,
-                                  activity: str,
-                                  terrain_prefs: Dict[str, float],
-                                  weather: Dict) -> Dict:
-        """Calculate likely movement vectors"""
-        # Base movement ranges by activity (in meters)
-        movement_ranges = {
-            'feeding': {'min': 100, 'max': 500},
-            'bedding': {'min': 0, 'max': 50},
-            'traveling': {'min': 500, 'max': 2000}
-        }
+    def _interpolate_weather(self, forecast: List[Dict], times: List[datetime]) -> Dict[str, np.ndarray]:
+        """Interpolate forecast periods onto the requested times
+        
+        Numeric fields are linearly interpolated (held constant beyond the
+        forecast range); categorical fields take the nearest period.
+        """
+        targets = np.array([t.timestamp() for t in times])
+        stamps = np.array([f['timestamp'].timestamp() for f in forecast])
+        weather = {}
         
-        # Adjust for weather
-        range_modifier = 1.0
-        if weather['temperature'] > 80:
-            range_modifier *= 0.7
-        if weather['wind_speed'] > 15:
-            range_modifier *= 0.8
-        if weather.get('precipitation_type') in ['rain', 'snow']:
-            range_modifier *= 0.6
+        for field, default in (('temperature', 45.0), ('wind_speed', 5.0),
+                               ('humidity', 50.0), ('pressure', 1013.0),
+                               ('cloud_cover', 0.0), ('precipitation', 0.0)):
+            values = np.array([f.get(field) for f in forecast], dtype=float)
+            known = ~np.isnan(values)
+            if known.any():
+                weather[field] = np.interp(targets, stamps[known], values[known])
+            else:
+                weather[field] = np.full(len(times), default)
+                
+        for field, default in (('precipitation_type', 'none'), ('wind_direction', 'N')):
+            if not forecast:
+                weather[field] = np.full(len(times), default, dtype=object)
+                continue
+            nearest = np.abs(targets[:, None] - stamps[None, :]).argmin(axis=1)
+            values = np.array([f.get(field) or default for f in forecast], dtype=object)
+            weather[field] = values[nearest]
             
-        movement_range = movement_ranges[activity]
-        adjusted_range = {
-            'min': movement_range['min'] * range_modifier,
-            'max': movement_range['max'] * range_modifier
-        }
+        return weather
         
-        # Calculate primary movement direction (relative to wind)
-        wind_dir = weather.get('wind_direction', 'N')
-        movement_dir = self._calculate_movement_direction(wind_dir, activity)
+    def _determine_primary_activities(self,
+                                    hours: np.ndarray,
+                                    behavior: Dict[str, np.ndarray],
+                                    weather: Dict[str, np.ndarray]) -> np.ndarray:
+        """Determine the primary activity for each hour from time and conditions"""
+        feeding = ((5 <= hours) & (hours <= 9)) | ((17 <= hours) & (hours <= 21))
+        midday = (10 <= hours) & (hours <= 16)
+        traveling = (midday &
+                     (behavior['breeding_factor'] > 0.7) &
+                     (weather['temperature'] < 70) &
+                     (weather['wind_speed'] < 15))
+        night_feeding = np.isin(hours, [22, 23, 0, 1])
         
-        return {
-            'range': adjusted_range,
-            'direction': movement_dir,
-            'terrain_preference_order': sorted(
-                terrain_prefs.items(),
-                key=lambda x: x[1],
-                reverse=True
-            )
-        }
+        return np.select(
+            [feeding, traveling, midday, night_feeding],
+            ['feeding', 'traveling', 'bedding', 'feeding'],
+            'bedding'
+        ).astype(object)
+        
+    def _adjust_terrain_preference_matrix(self,
+                                        animal_type: str,
+                                        activities: np.ndarray,
+                                        weather: Dict[str, np.ndarray],
+                                        behavior: Dict[str, np.ndarray]):
+        """Adjust terrain preferences for conditions; one normalized row per hour"""
+        prefs = self.terrain_preferences[animal_type]
+        terrain_types = list(prefs['feeding'].keys())
+        column = {terrain: j for j, terrain in enumerate(terrain_types)}
+        matrix = np.array([[prefs[a][t] for t in terrain_types] for a in activities], dtype=float)
         
-    def _calculate_movement_direction(self,
-                                   wind_dir: str,
-                                   activity: str) -> str:
-        """Calculate likely movement direction relative to wind"""
-        # Convert cardinal direction to degrees
-        dir_to_deg = {
-            'N': 0, 'NNE': 22.5, 'NE': 45, 'ENE': 67.5,
-            'E': 90, 'ESE': 112.5, 'SE': 135, 'SSE': 157.5,
-            'S': 180, 'SSW': 202.5, 'SW': 225, 'WSW': 247.5,
-            'W': 270, 'WNW': 292.5, 'NW': 315, 'NNW': 337.5
+        rain = weather['precipitation_type'] == 'rain'
+        adjustments = [
+            (weather['temperature'] > 80, {'forest': 1.2, 'meadow': 0.8}),
+            (weather['wind_speed'] > 15, {'forest': 1.3, 'forest_edge': 1.1, 'meadow': 0.7}),
+            (rain, {'forest': 1.2, 'meadow': 0.8}),
+            (behavior['breeding_factor'] > 0.5, {'meadow': 1.2, 'forest_edge': 1.1}),
+            (behavior['migration_factor'] > 0.5, {'forest_edge': 1.2, 'meadow': 1.1})
+        ]
+        for mask, factors in adjustments:
+            for terrain, factor in factors.items():
+                matrix[:, column[terrain]] *= np.where(mask, factor, 1.0)
+                
+        # Normalize preferences
+        matrix /= matrix.sum(axis=1, keepdims=True)
+        return terrain_types, matrix
+        
+    def _calculate_movement_ranges(self,
+                                 activities: np.ndarray,
+                                 weather: Dict[str, np.ndarray]) -> np.ndarray:
+        """Likely movement range (min, max) in meters for each hour"""
+        movement_ranges = {
+            'feeding': (100, 500),
+            'bedding': (0, 50),
+            'traveling': (500, 2000)
         }
+        base = np.array([movement_ranges[a] for a in activities], dtype=float)
         
-        wind_deg = dir_to_deg.get(wind_dir, 0)
+        range_modifier = (
+            np.where(weather['temperature'] > 80, 0.7, 1.0) *
+            np.where(weather['wind_speed'] > 15, 0.8, 1.0) *
+            np.where(np.isin(weather['precipitation_type'], ['rain', 'snow']), 0.6, 1.0)
+        )
+        return base * range_modifier[:, None]
         
-        if activity == 'feeding':
-            # Generally crosswind
-            movement_deg = (wind_deg + 90) % 360
-        elif activity == 'traveling':
-            # Generally downwind
-            movement_deg = (wind_deg + 180) % 360
-        else:  # bedding
-            # Generally upwind but sheltered
-            movement_deg = wind_deg
-            
-        # Convert back to cardinal direction
-        deg_to_dir = {v: k for k, v in dir_to_deg.items()}
-        closest_dir = min(deg_to_dir.keys(),
-                         key=lambda x: abs(x - movement_deg))
-        return deg_to_dir[closest_dir]
+    def _calculate_movement_directions(self,
+                                     wind_directions: np.ndarray,
+                                     activities: np.ndarray) -> List[str]:
+        """Likely movement direction relative to the wind for each hour"""
+        wind_deg = np.array([COMPASS_POINTS.index(d) * 22.5 if d in COMPASS_POINTS else 0.0
+                             for d in wind_directions])
+        # Feeding crosswind, traveling downwind, bedding upwind
+        offsets = np.select(
+            [activities == 'feeding', activities == 'traveling'], [90.0, 180.0], 0.0
+        )
+        steps = np.round(((wind_deg + offsets) % 360) / 22.5).astype(int) % len(COMPASS_POINTS)
+        return [COMPASS_POINTS[i] for i in steps]
         
-    def _calculate_confidence_score(self,
-                                  behavior: Dict[str, float],
-                                  weather: Dict) -> float:
-        """Calculate confidence score for predictions"""
-        # Base confidence from behavior factors
+    def _calculate_confidence_scores(self,
+                                   behavior: Dict[str, np.ndarray],
+                                   weather: Dict[str, np.ndarray]) -> np.ndarray:
+        """Confidence score for each hour's prediction"""
         behavior_confidence = np.mean([
             behavior['breeding_factor'],
             behavior['activity_factor'],
-            1 - behavior['migration_factor']  # More confident when not migrating
-        ])
-        
-        # Weather confidence
-        weather_confidence = 1.0
-        if weather['wind_speed'] > 20:
-            weather_confidence *= 0.8
-        if weather.get('precipitation_type') in ['rain', 'snow']:
-            weather_confidence *= 0.9
-            
-        # Combine confidences
-        return min(1.0, behavior_confidence * weather_confidence)
+            1 - behavior['migration_factor']
+        ], axis=0)
+        weather_confidence = (
+            np.where(weather['wind_speed'] > 20, 0.8, 1.0) *
+            np.where(np.isin(weather['precipitation_type'], ['rain', 'snow']), 0.9, 1.0)
+        )
+        return np.minimum(1.0, behavior_confidence * weather_confidence)
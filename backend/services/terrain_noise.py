@@ -0,0 +1,57 @@
+import numpy as np
+
+_MASK64 = np.uint64(0xFFFFFFFFFFFFFFFF)
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+
+def _splitmix64(x: np.ndarray) -> np.ndarray:
+    """Finalizer from SplitMix64; maps uint64 arrays to well-mixed uint64s"""
+    x = (x + _GOLDEN) & _MASK64
+    x = ((x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)) & _MASK64
+    x = ((x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)) & _MASK64
+    return x ^ (x >> np.uint64(31))
+
+def _lattice_hash(ix: np.ndarray, iy: np.ndarray, seed: int, channel: int) -> np.ndarray:
+    """Hash integer lattice coordinates together with a seed and channel"""
+    h = _splitmix64(ix.astype(np.uint64) ^ np.uint64((seed * 0x100000001B3) & 0xFFFFFFFFFFFFFFFF))
+    h = _splitmix64(h ^ iy.astype(np.uint64))
+    return _splitmix64(h ^ np.uint64(channel))
+
+def _lattice_gaussian(ix: np.ndarray, iy: np.ndarray, seed: int, channel: int) -> np.ndarray:
+    """Standard normal value attached to each lattice point (Box-Muller)"""
+    h = _lattice_hash(ix, iy, seed, channel)
+    u1 = ((h >> np.uint64(40)).astype(np.float64) + 0.5) / float(1 << 24)
+    u2 = ((h & np.uint64(0xFFFFFF)).astype(np.float64) + 0.5) / float(1 << 24)
+    return np.sqrt(-2.0 * np.log(u1)) * np.cos(2.0 * np.pi * u2)
+
+def value_noise(lats, lngs, seed: int, channel: int = 0,
+                cell_size: float = 0.01) -> np.ndarray:
+    """Smooth, deterministic noise field keyed by coordinates and seed.
+
+    Gaussian values are hashed onto a lattice of cell_size degrees and
+    blended with smoothstep-weighted bilinear interpolation, so the same
+    (lat, lng, seed, channel) always yields the same value in any process.
+    Values have zero mean and a standard deviation a little below one.
+    """
+    lats, lngs = np.broadcast_arrays(
+        np.asarray(lats, dtype=np.float64), np.asarray(lngs, dtype=np.float64)
+    )
+    shape = lats.shape
+    y = np.atleast_1d(lats).ravel() / cell_size
+    x = np.atleast_1d(lngs).ravel() / cell_size
+    y0 = np.floor(y)
+    x0 = np.floor(x)
+    ty = y - y0
+    tx = x - x0
+    ty = ty * ty * (3 - 2 * ty)
+    tx = tx * tx * (3 - 2 * tx)
+    iy = y0.astype(np.int64)
+    ix = x0.astype(np.int64)
+
+    v00 = _lattice_gaussian(ix, iy, seed, channel)
+    v10 = _lattice_gaussian(ix + 1, iy, seed, channel)
+    v01 = _lattice_gaussian(ix, iy + 1, seed, channel)
+    v11 = _lattice_gaussian(ix + 1, iy + 1, seed, channel)
+
+    top = v00 + (v10 - v00) * tx
+    bottom = v01 + (v11 - v01) * tx
+    return (top + (bottom - top) * ty).reshape(shape)
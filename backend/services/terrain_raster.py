@@ -0,0 +1,108 @@
+import os
+import logging
+from pathlib import Path
+from threading import Lock
+from typing import Callable, Dict, Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Tile columns never exceed 360 / tile degrees, so this keeps tile ids unique
+_TILE_ID_STRIDE = 1 << 32
+
+class TerrainRasterStore:
+    """Tiled, memory-mapped rasters of precomputed terrain layers.
+
+    The globe is cut into square tiles of tile_size x tile_size cells of
+    cell_size degrees. Each tile holds one float32 .npy file per layer and
+    is built lazily from terrain_model the first time a point inside it is
+    sampled. Sampling maps whole coordinate arrays to cells by integer
+    arithmetic and reads the values with array indexing.
+    """
+
+    LAYERS = ('elevation', 'slope', 'forest_density', 'water_distance')
+
+    def __init__(self,
+                 terrain_model: Callable[[np.ndarray, np.ndarray], Dict[str, np.ndarray]],
+                 root='data/terrain_tiles',
+                 cell_size: float = 0.0025,
+                 tile_size: int = 400):
+        self.terrain_model = terrain_model
+        self.cell_size = cell_size
+        self.tile_size = tile_size
+        self.root = Path(root) / f'{cell_size:g}deg_{tile_size}'
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._tiles = {}
+        self._tile_lock = Lock()
+
+    def sample(self, lats, lngs) -> Dict[str, np.ndarray]:
+        """Sample every layer at arrays of locations (nearest cell)"""
+        lats, lngs = np.broadcast_arrays(
+            np.asarray(lats, dtype=float), np.asarray(lngs, dtype=float)
+        )
+        shape = lats.shape
+        rows = np.floor(lats.ravel() / self.cell_size).astype(np.int64)
+        cols = np.floor(lngs.ravel() / self.cell_size).astype(np.int64)
+        tile_rows, local_rows = np.divmod(rows, self.tile_size)
+        tile_cols, local_cols = np.divmod(cols, self.tile_size)
+
+        # Group points by tile with one sort instead of a mask per tile
+        tile_ids = tile_rows * _TILE_ID_STRIDE + tile_cols
+        order = np.argsort(tile_ids, kind='stable')
+        sorted_ids = tile_ids[order]
+        starts = np.flatnonzero(np.r_[True, sorted_ids[1:] != sorted_ids[:-1]])
+        ends = np.r_[starts[1:], sorted_ids.size]
+
+        result = {layer: np.empty(rows.size, dtype=np.float32) for layer in self.LAYERS}
+        for start, end in zip(starts, ends):
+            idx = order[start:end]
+            first = idx[0]
+            tile = self._get_tile(int(tile_rows[first]), int(tile_cols[first]))
+            r, c = local_rows[idx], local_cols[idx]
+            for layer in self.LAYERS:
+                result[layer][idx] = tile[layer][r, c]
+
+        return {layer: values.reshape(shape) for layer, values in result.items()}
+
+    def _tile_dir(self, tile_row: int, tile_col: int) -> Path:
+        return self.root / f'r{tile_row}_c{tile_col}'
+
+    def _get_tile(self, tile_row: int, tile_col: int) -> Dict[str, np.ndarray]:
+        """Get memory-mapped layers for a tile, building it on first use"""
+        key = (tile_row, tile_col)
+        tile = self._tiles.get(key)
+        if tile is not None:
+            return tile
+
+        with self._tile_lock:
+            tile = self._tiles.get(key)
+            if tile is None:
+                tile_dir = self._tile_dir(tile_row, tile_col)
+                if not all((tile_dir / f'{layer}.npy').exists() for layer in self.LAYERS):
+                    self._build_tile(tile_row, tile_col)
+                tile = {
+                    layer: np.load(tile_dir / f'{layer}.npy', mmap_mode='r')
+                    for layer in self.LAYERS
+                }
+                self._tiles[key] = tile
+        return tile
+
+    def _tile_origin(self, tile_row: int, tile_col: int) -> Tuple[float, float]:
+        tile_deg = self.cell_size * self.tile_size
+        return tile_row * tile_deg, tile_col * tile_deg
+
+    def _build_tile(self, tile_row: int, tile_col: int):
+        """Evaluate the terrain model at every cell centre and save the layers"""
+        lat0, lng0 = self._tile_origin(tile_row, tile_col)
+        centers = (np.arange(self.tile_size) + 0.5) * self.cell_size
+        lat_grid, lng_grid = np.meshgrid(lat0 + centers, lng0 + centers, indexing='ij')
+        layers = self.terrain_model(lat_grid, lng_grid)
+
+        tile_dir = self._tile_dir(tile_row, tile_col)
+        tile_dir.mkdir(parents=True, exist_ok=True)
+        for layer in self.LAYERS:
+            # Write then rename so concurrent readers never map a partial file
+            tmp_path = tile_dir / f'{layer}.{os.getpid()}.tmp.npy'
+            np.save(tmp_path, np.asarray(layers[layer], dtype=np.float32))
+            os.replace(tmp_path, tile_dir / f'{layer}.npy')
+        logger.info(f"Built terrain tile {tile_row},{tile_col} in {tile_dir}")
@@ -1,18 +1,60 @@
 import numpy as np
 import requests
 import json
+import os
 from pathlib import Path
+from typing import Dict, Optional
 import logging
+from .terrain_raster import TerrainRasterStore
+from .terrain_noise import value_noise
+from .cache import get_cache, quantize_point
 
 logger = logging.getLogger(__name__)
 
+# Independent noise field per terrain layer
+NOISE_CHANNELS = {
+    'elevation': 1,
+    'slope': 2,
+    'forest_density': 3,
+    'water_distance': 4
+}
+
 class TerrainService:
-    def __init__(self):
+    def __init__(self, use_raster: bool = None, seed: Optional[int] = None):
         self.data_dir = Path('data')
         self.data_dir.mkdir(exist_ok=True)
-        self.elevation_cache = {}
         self.water_features = self._load_water_features()
         
+        # With a seed, noise comes from a coordinate-hashed field instead of
+        # np.random, so every getter is a pure function of (lat, lng, seed)
+        if seed is None and os.getenv('TERRAIN_SEED'):
+            seed = int(os.getenv('TERRAIN_SEED'))
+        self.seed = seed
+        self.deterministic = seed is not None
+        
+        # Precomputed, memory-mapped terrain tiles for bulk lookups. Tiles
+        # bake in the noise they were built with, so they are on by default
+        # only for seeded terrain; TERRAIN_RASTER=1 opts in without a seed,
+        # freezing one random draw under terrain_tiles/random
+        if use_raster is None:
+            raster_flag = os.getenv('TERRAIN_RASTER')
+            use_raster = self.deterministic if raster_flag is None else raster_flag != '0'
+        tile_set = f'seed_{seed}' if self.deterministic else 'random'
+        self.raster_store = TerrainRasterStore(
+            self._compute_terrain_arrays,
+            root=self.data_dir / 'terrain_tiles' / tile_set
+        ) if use_raster else None
+        
+        # Results only repeat when noise is seeded or baked into raster tiles,
+        # so only then are lookups cached (shared by every instance)
+        self.cacheable = self.deterministic or self.raster_store is not None
+        self.elevation_cache = get_cache(
+            f'terrain:{tile_set}',
+            max_entries=int(os.getenv('TERRAIN_CACHE_ENTRIES', 200000)),
+            max_bytes=int(os.getenv('TERRAIN_CACHE_BYTES', 64 * 1024 * 1024)),
+            ttl=float(os.getenv('TERRAIN_CACHE_TTL', 24 * 3600))
+        )
+        
     def _load_water_features(self):
         """Load water features from file or return empty data if file doesn't exist"""
         water_file = self.data_dir / 'water_features.json'
@@ -24,6 +66,14 @@ class TerrainService:
                 logger.warning("Error loading water features file")
         return {'features': []}
         
+    def _noise(self, lat, lng, layer: str, scale: float):
+        """Noise for a terrain layer: seeded field when deterministic, else random"""
+        if self.deterministic:
+            noise = scale * value_noise(lat, lng, self.seed, NOISE_CHANNELS[layer])
+        else:
+            noise = np.random.normal(0, scale, np.broadcast(lat, lng).shape)
+        return noise if np.ndim(noise) else float(noise)
+        
     def get_elevation(self, lat: float, lng: float) -> float:
         """Get elevation data for a location (using mock data for development)"""
         # Mock elevation based on latitude and longitude
@@ -32,7 +82,7 @@ class TerrainService:
         lng_factor = abs(lng + 105) * 50  # Elevation varies with distance from 105°W
         
         # Add some random variation
-        random_factor = np.random.normal(0, 100)
+        random_factor = self._noise(lat, lng, 'elevation', 100)
         elevation = base_elevation + lat_factor + lng_factor + random_factor
         
         return max(1500.0, min(4000.0, elevation))  # Keep elevation between 1500m and 4000m
@@ -45,7 +95,7 @@ class TerrainService:
         lng_factor = abs(lng + 105) * 2  # Slope varies with distance from 105°W
         
         # Add some random variation
-        random_factor = np.random.normal(0, 2)
+        random_factor = self._noise(lat, lng, 'slope', 2)
         slope = base_slope + lat_factor + lng_factor + random_factor
         
         return max(0.0, min(45.0, slope))  # Keep slope between 0° and 45°
@@ -63,7 +113,7 @@ class TerrainService:
         slope_factor = 1 - slope / 45
         
         # Add some random variation
-        random_factor = np.random.normal(0, 0.1)
+        random_factor = self._noise(lat, lng, 'forest_density', 0.1)
         
         density = 0.5 * elevation_factor + 0.3 * slope_factor + random_factor
         return max(0.0, min(1.0, density))
@@ -76,7 +126,7 @@ class TerrainService:
         lng_factor = abs(lng + 105) * 0.2  # Distance varies with longitude
         
         # Add some random variation
-        random_factor = np.random.normal(0, 0.2)
+        random_factor = self._noise(lat, lng, 'water_distance', 0.2)
         distance = base_distance + lat_factor + lng_factor + random_factor
         
         return max(0.1, distance), None  # Ensure minimum distance of 100m
@@ -95,10 +145,56 @@ class TerrainService:
         
     def get_terrain_features(self, lat: float, lng: float) -> dict:
         """Get all terrain features for a location"""
-        elevation = self.get_elevation(lat, lng)
-        slope = self.get_slope(lat, lng)
-        forest_density = self.get_forest_density(lat, lng)
-        water_distance, _ = self.find_nearest_water(lat, lng)
+        key = quantize_point(lat, lng)
+        if self.cacheable:
+            cached = self.elevation_cache.get(key)
+            if cached is not None:
+                return dict(cached)
+            
+        if self.raster_store is not None:
+            sampled = self.raster_store.sample(lat, lng)
+            features = {name: float(values) for name, values in sampled.items()}
+        else:
+            water_distance, _ = self.find_nearest_water(lat, lng)
+            features = {
+                'elevation': self.get_elevation(lat, lng),
+                'slope': self.get_slope(lat, lng),
+                'forest_density': self.get_forest_density(lat, lng),
+                'water_distance': water_distance
+            }
+            
+        if self.cacheable:
+            self.elevation_cache[key] = features
+        return dict(features)
+
+    def get_terrain_features_batch(self, lats, lngs) -> Dict[str, np.ndarray]:
+        """Get all terrain features for arrays of locations in one vectorized pass"""
+        if self.raster_store is not None:
+            return self.raster_store.sample(lats, lngs)
+        return self._compute_terrain_arrays(lats, lngs)
+        
+    def _compute_terrain_arrays(self, lats, lngs) -> Dict[str, np.ndarray]:
+        """Evaluate the terrain model directly at arrays of locations"""
+        lats = np.asarray(lats, dtype=float)
+        lngs = np.asarray(lngs, dtype=float)
+        lat_offset = np.abs(lats - 40)
+        lng_offset = np.abs(lngs + 105)
+        
+        elevation = 2000.0 + lat_offset * 100 + lng_offset * 50 + self._noise(lats, lngs, 'elevation', 100)
+        elevation = np.clip(elevation, 1500.0, 4000.0)
+        
+        slope = 10.0 + lat_offset * 5 + lng_offset * 2 + self._noise(lats, lngs, 'slope', 2)
+        slope = np.clip(slope, 0.0, 45.0)
+        
+        # Same density model as get_forest_density, driven by the elevation
+        # and slope returned alongside it
+        elevation_factor = 1 - np.abs(elevation - 2500) / 2000
+        slope_factor = 1 - slope / 45
+        forest_density = 0.5 * elevation_factor + 0.3 * slope_factor + self._noise(lats, lngs, 'forest_density', 0.1)
+        forest_density = np.clip(forest_density, 0.0, 1.0)
+        
+        water_distance = 1.0 + lat_offset * 0.5 + lng_offset * 0.2 + self._noise(lats, lngs, 'water_distance', 0.2)
+        water_distance = np.maximum(0.1, water_distance)
         
         return {
             'elevation': elevation,
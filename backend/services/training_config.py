@@ -0,0 +1,227 @@
+import os
+import sys
+import time
+import logging
+import tracemalloc
+from threading import Event, Thread
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+def _env_flag(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+def _max_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process so far"""
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return max_rss / (1024 * 1024) if sys.platform == 'darwin' else max_rss / 1024
+
+def _current_rss_mb() -> Optional[float]:
+    """Resident set size of this process right now; None where /proc is missing"""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+
+def _format_mb(value: Optional[float]) -> str:
+    return 'n/a' if value is None else f'{value:.1f} MB'
+
+class _RSSMonitor:
+    """Samples this process's RSS while a block runs to find the block's peak.
+
+    Native allocations (numpy, sklearn's tree builders) are included, which
+    tracemalloc misses. If the process-lifetime maximum rises during the
+    block, that new maximum is the block's exact peak and replaces the
+    sampled one.
+    """
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.before_mb = None
+        self.after_mb = None
+        self.peak_mb = None
+        self._stop = Event()
+        self._thread = None
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            rss = _current_rss_mb()
+            if rss is not None:
+                self.peak_mb = max(self.peak_mb, rss)
+
+    def __enter__(self):
+        self._lifetime_peak = _max_rss_mb()
+        self.before_mb = self.peak_mb = _current_rss_mb()
+        if self.before_mb is not None:
+            self._thread = Thread(target=self._sample, daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.after_mb = _current_rss_mb()
+        if self.after_mb is not None:
+            self.peak_mb = max(self.peak_mb, self.after_mb)
+        lifetime_peak = _max_rss_mb()
+        if lifetime_peak is not None and lifetime_peak > (self._lifetime_peak or 0):
+            # Page and kilobyte rounding can leave it a hair under a sample
+            self.peak_mb = max(self.peak_mb or 0, lifetime_peak)
+        return False
+
+@dataclass
+class FitProfile:
+    name: str
+    wall_seconds: float
+    n_samples: int
+    n_features: int
+    n_jobs: Optional[int]
+    python_peak_mb: Optional[float] = None
+    rss_before_mb: Optional[float] = None
+    rss_peak_mb: Optional[float] = None
+    rss_after_mb: Optional[float] = None
+
+    @property
+    def rss_growth_mb(self) -> Optional[float]:
+        """Memory the fit needed on top of what the process already held"""
+        if self.rss_peak_mb is None or self.rss_before_mb is None:
+            return None
+        return self.rss_peak_mb - self.rss_before_mb
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**asdict(self), 'rss_growth_mb': self.rss_growth_mb}
+
+@dataclass
+class TrainingConfig:
+    """How models are fitted: cores per model, model-level parallelism and
+    profiling.
+
+    n_jobs is passed to every estimator that accepts it (-1 uses every
+    core). After fitting it is reset to serve_n_jobs, so a saved model
+    does not start a thread pool for each single-row prediction.
+    tree_chunk_size > 0 grows forests that many trees at a time with
+    warm_start, logging progress between chunks. parallel_models lets
+    MLService.train_models fit its models at the same time in a process
+    pool. Every fit reports the process's RSS before and after it and its
+    peak during the fit; trace_memory adds the Python-level allocation peak
+    from tracemalloc, at some cost in speed.
+    """
+    n_jobs: Optional[int] = -1
+    serve_n_jobs: Optional[int] = None
+    parallel_models: bool = False
+    tree_chunk_size: int = 0
+    trace_memory: bool = False
+
+    @classmethod
+    def from_env(cls) -> 'TrainingConfig':
+        n_jobs = os.getenv('TRAINING_N_JOBS')
+        return cls(
+            n_jobs=int(n_jobs) if n_jobs else -1,
+            parallel_models=_env_flag('TRAINING_PARALLEL_MODELS', False),
+            tree_chunk_size=int(os.getenv('TRAINING_TREE_CHUNK_SIZE', 0)),
+            trace_memory=_env_flag('TRAINING_TRACE_MEMORY', False)
+        )
+
+    def for_parallel_models(self, n_models: int) -> 'TrainingConfig':
+        """Split the cores between models that are fitted at the same time"""
+        n_jobs = self.n_jobs
+        if n_jobs is not None and n_jobs < 0:
+            n_jobs = os.cpu_count() or 1
+        if n_jobs is not None:
+            n_jobs = max(1, n_jobs // max(1, n_models))
+        return TrainingConfig(
+            n_jobs=n_jobs,
+            serve_n_jobs=self.serve_n_jobs,
+            parallel_models=False,
+            tree_chunk_size=self.tree_chunk_size,
+            trace_memory=self.trace_memory
+        )
+
+    def apply(self, estimator):
+        """Set n_jobs on an estimator that supports it"""
+        if 'n_jobs' in estimator.get_params():
+            estimator.set_params(n_jobs=self.n_jobs)
+        return estimator
+
+    def fit(self, estimator, X, y, name: Optional[str] = None) -> FitProfile:
+        """Fit an estimator with this configuration and profile the fit"""
+        name = name or type(estimator).__name__
+        parallel = 'n_jobs' in estimator.get_params()
+        self.apply(estimator)
+
+        started_tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        if self.trace_memory and hasattr(tracemalloc, 'reset_peak'):
+            # Python 3.9+; before that a fit sharing an earlier tracing
+            # session reports that session's peak
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            with _RSSMonitor() as rss:
+                self._fit(estimator, X, y, name)
+            wall_seconds = time.perf_counter() - start
+            python_peak_mb = (
+                tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+                if self.trace_memory else None
+            )
+        finally:
+            if started_tracing:
+                tracemalloc.stop()
+
+        if parallel:
+            estimator.set_params(n_jobs=self.serve_n_jobs)
+
+        profile = FitProfile(
+            name=name,
+            wall_seconds=wall_seconds,
+            n_samples=len(X),
+            n_features=X.shape[1],
+            n_jobs=self.n_jobs if parallel else 1,
+            python_peak_mb=python_peak_mb,
+            rss_before_mb=rss.before_mb,
+            rss_peak_mb=rss.peak_mb,
+            rss_after_mb=rss.after_mb
+        )
+        logger.info(
+            f"Fitted {name} on {profile.n_samples} rows in {wall_seconds:.2f}s "
+            f"(python peak {_format_mb(python_peak_mb)}, "
+            f"RSS peak {_format_mb(profile.rss_peak_mb)}, +{_format_mb(profile.rss_growth_mb)})"
+        )
+        return profile
+
+    def _fit(self, estimator, X, y, name: str):
+        params = estimator.get_params()
+        chunked = (self.tree_chunk_size > 0 and 'warm_start' in params
+                   and 'n_estimators' in params)
+        if not chunked:
+            estimator.fit(X, y)
+            return
+
+        total = params['n_estimators']
+        try:
+            for n_trees in range(self.tree_chunk_size, total + self.tree_chunk_size,
+                                 self.tree_chunk_size):
+                # The first chunk starts over, discarding any trees from an
+                # earlier fit; later chunks add to it
+                estimator.set_params(n_estimators=min(n_trees, total),
+                                     warm_start=n_trees > self.tree_chunk_size)
+                estimator.fit(X, y)
+                logger.info(f"{name}: {estimator.n_estimators}/{total} trees")
+        finally:
+            estimator.set_params(warm_start=params['warm_start'])
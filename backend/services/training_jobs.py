@@ -0,0 +1,281 @@
+import os
+import json
+import time
+import uuid
+import shutil
+import hashlib
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from pathlib import Path
+from threading import Lock
+from typing import Any, Dict, List, Optional
+import joblib
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score, log_loss, roc_auc_score
+from sklearn.model_selection import train_test_split
+from .training_config import TrainingConfig
+from .training_service import TrainingService
+
+logger = logging.getLogger(__name__)
+
+FINISHED_STATES = ('succeeded', 'failed')
+
+# A lock older than this is treated as left behind by a dead worker
+LOCK_TIMEOUT = float(os.getenv('TRAINING_JOB_TIMEOUT', 3600))
+
+def _write_json(path: Path, data: Dict):
+    """Write JSON atomically so readers never see a partial record"""
+    tmp_path = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+    tmp_path.write_text(json.dumps(data, indent=2, default=str))
+    os.replace(tmp_path, path)
+
+def _now() -> str:
+    return datetime.utcnow().isoformat()
+
+class TrainingJobQueue:
+    """Queue of model training jobs run by a background worker process.
+
+    Job records are JSON files under root/training_jobs, so any web worker
+    can poll a job started by another. A lock file admits one active job at
+    a time across processes; submitting while a job is queued or running
+    returns that job instead of starting another. Each run produces a
+    versioned artifact under root/model_versions/<version>/ with its
+    metadata, and is published to root/model.pkl with an atomic rename.
+    """
+
+    def __init__(self, root='data'):
+        self.root = Path(root)
+        self.jobs_dir = self.root / 'training_jobs'
+        self.versions_dir = self.root / 'model_versions'
+        self.jobs_dir.mkdir(parents=True, exist_ok=True)
+        self.versions_dir.mkdir(parents=True, exist_ok=True)
+        self.lock_path = self.jobs_dir / 'active.lock'
+        self.model_path = self.root / 'model.pkl'
+        self.metadata_path = self.root / 'model.json'
+        self._executor = None
+        self._executor_lock = Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    # Spawned, not forked, so the worker does not inherit
+                    # the web server's threads and sockets
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=1,
+                        mp_context=multiprocessing.get_context('spawn')
+                    )
+        return self._executor
+
+    def _job_path(self, job_id: str) -> Path:
+        return self.jobs_dir / f'{job_id}.json'
+
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        """Get a job record, or None if there is no such job"""
+        # Job ids are hex; anything else cannot name a record
+        if not job_id or not all(c in '0123456789abcdef' for c in job_id):
+            return None
+        try:
+            return json.loads(self._job_path(job_id).read_text())
+        except FileNotFoundError:
+            return None
+
+    def list_jobs(self) -> List[Dict]:
+        """Get every job record, newest first"""
+        jobs = [json.loads(path.read_text()) for path in self.jobs_dir.glob('*.json')]
+        return sorted(jobs, key=lambda job: job['created_at'], reverse=True)
+
+    def active_job(self) -> Optional[Dict]:
+        """Get the queued or running job, if any"""
+        try:
+            job_id = self.lock_path.read_text().strip()
+        except FileNotFoundError:
+            return None
+        job = self.get_job(job_id)
+        if job is None or job['status'] in FINISHED_STATES:
+            return None
+        return job
+
+    def _acquire_lock(self, job_id: str) -> Optional[str]:
+        """Take the active-job lock, or return the id of the job holding it"""
+        while True:
+            try:
+                fd = os.open(self.lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                try:
+                    holder = self.lock_path.read_text().strip()
+                    age = time.time() - self.lock_path.stat().st_mtime
+                except FileNotFoundError:
+                    continue
+                if not holder:
+                    # Holder has created the file but not written its id yet
+                    time.sleep(0.01)
+                    continue
+                job = self.get_job(holder)
+                if job is None or job['status'] in FINISHED_STATES or age > LOCK_TIMEOUT:
+                    logger.warning(f"Removing stale training lock held by job {holder}")
+                    self._release_lock(holder)
+                    continue
+                return holder
+            with os.fdopen(fd, 'w') as f:
+                f.write(job_id)
+            return None
+
+    def _release_lock(self, job_id: str):
+        """Release the lock if it is still held by job_id"""
+        try:
+            if self.lock_path.read_text().strip() == job_id:
+                self.lock_path.unlink()
+        except FileNotFoundError:
+            pass
+
+    def submit(self, params: Dict[str, Any]) -> Dict:
+        """Queue a training job, or return the job that is already active"""
+        job = {
+            'id': uuid.uuid4().hex,
+            'status': 'queued',
+            'params': params,
+            'created_at': _now(),
+            'started_at': None,
+            'finished_at': None,
+            'version': None,
+            'metrics': None,
+            'profile': None,
+            'error': None
+        }
+        # Record first, so a job holding the lock always has a record
+        _write_json(self._job_path(job['id']), job)
+        holder = self._acquire_lock(job['id'])
+        if holder is not None:
+            self._job_path(job['id']).unlink()
+            return self.get_job(holder) or self.submit(params)
+
+        try:
+            future = self._get_executor().submit(run_training_job, str(self.root), job['id'])
+            future.add_done_callback(
+                lambda future, job_id=job['id']: self._on_worker_done(job_id, future)
+            )
+        except Exception as e:
+            job.update(status='failed', error=str(e), finished_at=_now())
+            _write_json(self._job_path(job['id']), job)
+            self._release_lock(job['id'])
+            raise
+        logger.info(f"Queued training job {job['id']}")
+        return job
+
+    def _on_worker_done(self, job_id: str, future):
+        """Fail a job whose worker died before recording a result"""
+        error = RuntimeError('cancelled') if future.cancelled() else future.exception()
+        if error is None:
+            return
+        job = self.get_job(job_id)
+        if job is not None and job['status'] not in FINISHED_STATES:
+            logger.error(f"Training worker for job {job_id} died: {error!r}")
+            job.update(status='failed', error=f"Worker died: {error!r}", finished_at=_now())
+            _write_json(self._job_path(job_id), job)
+        self._release_lock(job_id)
+        if isinstance(error, BrokenProcessPool):
+            # A broken pool rejects every later submit; start a fresh one
+            with self._executor_lock:
+                self._executor = None
+
+    def run(self, job_id: str) -> Dict:
+        """Run a queued job in this process; called by the worker"""
+        job = self.get_job(job_id)
+        job.update(status='running', started_at=_now())
+        _write_json(self._job_path(job_id), job)
+        try:
+            version, metadata = self._train(job_id, job['params'])
+            self._publish(version)
+            job.update(status='succeeded', version=version, metrics=metadata['metrics'],
+                       profile=metadata['profile'])
+            logger.info(f"Training job {job_id} published model {version}")
+        except Exception as e:
+            logger.exception(f"Training job {job_id} failed")
+            job.update(status='failed', error=str(e))
+        finally:
+            job['finished_at'] = _now()
+            _write_json(self._job_path(job_id), job)
+            self._release_lock(job_id)
+        return job
+
+    def _train(self, job_id: str, params: Dict[str, Any]):
+        """Fit the game model and save it as a new version with its metadata"""
+        feature_columns = params['feature_columns']
+        target = params.get('target', 'animal_present')
+        data = TrainingService().get_training_data(
+            params['gmu_id'], params['n_samples'], columns=feature_columns + [target]
+        )
+        data_hash = hashlib.sha256(
+            pd.util.hash_pandas_object(data[feature_columns + [target]], index=False).values
+        ).hexdigest()
+
+        X_train, X_test, y_train, y_test = train_test_split(
+            data[feature_columns], data[target], test_size=0.2, random_state=42
+        )
+        model = RandomForestClassifier(**params.get('model_params', {}))
+        profile = TrainingConfig.from_env().fit(model, X_train, y_train, name='game')
+
+        probabilities = model.predict_proba(X_test)
+        metrics = {
+            'accuracy': float(accuracy_score(y_test, model.predict(X_test))),
+            'log_loss': float(log_loss(y_test, probabilities, labels=model.classes_)),
+            'roc_auc': float(roc_auc_score(y_test, probabilities[:, 1]))
+                       if y_test.nunique() > 1 else None,
+            'n_train': int(len(X_train)),
+            'n_test': int(len(X_test))
+        }
+
+        version = f"{datetime.utcnow():%Y%m%dT%H%M%S}-{job_id[:8]}"
+        version_dir = self.versions_dir / version
+        version_dir.mkdir(parents=True)
+        metadata = {
+            'version': version,
+            'job_id': job_id,
+            'created_at': _now(),
+            'feature_columns': feature_columns,
+            'target': target,
+            'data_hash': data_hash,
+            'params': params,
+            'metrics': metrics,
+            'profile': profile.to_dict()
+        }
+        joblib.dump(model, version_dir / 'model.pkl')
+        _write_json(version_dir / 'metadata.json', metadata)
+        return version, metadata
+
+    def _publish(self, version: str):
+        """Make a version the served model with one rename per file"""
+        version_dir = self.versions_dir / version
+        tmp_path = self.model_path.with_name(f'.{self.model_path.name}.{os.getpid()}.tmp')
+        shutil.copyfile(version_dir / 'model.pkl', tmp_path)
+        os.replace(tmp_path, self.model_path)
+        _write_json(self.metadata_path, json.loads((version_dir / 'metadata.json').read_text()))
+
+    def get_published_metadata(self) -> Optional[Dict]:
+        """Get the metadata of the currently served model"""
+        try:
+            return json.loads(self.metadata_path.read_text())
+        except FileNotFoundError:
+            return None
+
+def run_training_job(root: str, job_id: str) -> Dict:
+    """Entry point for the worker process"""
+    logging.basicConfig(level=logging.INFO)
+    return TrainingJobQueue(root).run(job_id)
+
+_queue = None
+_queue_lock = Lock()
+
+def get_training_queue() -> TrainingJobQueue:
+    """Get the process-wide training job queue"""
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = TrainingJobQueue()
+    return _queue
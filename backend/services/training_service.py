@@ -1,54 +1,92 @@
-from datetime import datetime, timedelta
 import numpy as np
 import pandas as pd
 from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+from .feature_store import FeatureStore
+from .gmu_service import GMUService
 from .terrain_service import TerrainService
 
+# Example bounds in Colorado, used for GMUs without boundary data
+DEFAULT_BOUNDS = {'north': 38.5, 'south': 37.5, 'east': -105.5, 'west': -106.5}
+
+DEFAULT_CHUNK_SIZE = 500000
+
 class TrainingService:
     def __init__(self):
         self.data_dir = Path('data')
         self.data_dir.mkdir(exist_ok=True)
         self.terrain_service = TerrainService()
+        self.feature_store = FeatureStore(self.data_dir / 'features' / 'synthetic')
+        
+    def _get_sampling_bounds(self, gmu_id: str) -> Dict[str, float]:
+        """Get the lat/lon box to sample a GMU from"""
+        bounds = GMUService().get_gmu_bounds(str(gmu_id))
+        if bounds is None:
+            return DEFAULT_BOUNDS
+        return bounds
+        
+    def iter_synthetic_chunks(self, gmu_id: str, n_samples: int,
+                              chunk_size: int = DEFAULT_CHUNK_SIZE,
+                              seed: Optional[int] = None) -> Iterator[pd.DataFrame]:
+        """Generate synthetic training rows for a GMU in chunks
+        
+        Locations are sampled inside the GMU's bounds and dates within 2024;
+        each chunk is built from whole arrays with one bulk terrain lookup,
+        so memory stays bounded by chunk_size however many rows are asked for.
+        """
+        rng = np.random.default_rng(seed)
+        bounds = self._get_sampling_bounds(gmu_id)
+        south, north = sorted((bounds['south'], bounds['north']))
+        west, east = sorted((bounds['west'], bounds['east']))
+        start_date = np.datetime64('2024-01-01')
         
-    def generate_synthetic_data(self, gmu_id: str, n_samples: int = 1000):
-        """Generate synthetic training data for the model"""
+        for offset in range(0, n_samples, chunk_size):
+            n = min(chunk_size, n_samples - offset)
+            dates = start_date + rng.integers(0, 365, n).astype('timedelta64[D]')
+            lats = rng.uniform(south, north, n)
+            lons = rng.uniform(west, east, n)
+            terrain = self.terrain_service.get_terrain_features_batch(lats, lons)
+            
+            yield pd.DataFrame({
+                'gmu_id': str(gmu_id),
+                'date': dates,
+                'latitude': lats,
+                'longitude': lons,
+                'elevation': terrain['elevation'],
+                'slope': terrain['slope'],
+                'forest_density': terrain['forest_density'],
+                'water_distance': terrain['water_distance'],
+                'temperature': rng.normal(15, 10, n),  # Mean 15°C, std 10°C
+                'precipitation': rng.exponential(5, n),  # Mean 5mm
+                'wind_speed': rng.gamma(2, 2, n),  # Shape 2, scale 2
+                'animal_present': rng.binomial(1, 0.3, n)  # 30% chance of presence
+            })
+        
+    def generate_synthetic_data(self, gmu_id: str, n_samples: int = 1000,
+                                seed: Optional[int] = None) -> int:
+        """Generate synthetic training data into the feature store
+        
+        Each chunk is written and released before the next is generated, so
+        memory stays bounded by one chunk. Returns the number of rows
+        written; read them back with feature_store.read or iter_batches.
+        """
         print("Generating synthetic training data...")
         
-        # Generate random dates within the current year
-        start_date = datetime(2024, 1, 1)
-        dates = [start_date + timedelta(days=int(x)) for x in np.random.randint(0, 365, n_samples)]
-        
-        # Generate random locations within GMU bounds (using example bounds)
-        lat_bounds = (37.5, 38.5)  # Example bounds for Colorado
-        lon_bounds = (-106.5, -105.5)
-        
-        lats = np.random.uniform(lat_bounds[0], lat_bounds[1], n_samples)
-        lons = np.random.uniform(lon_bounds[0], lon_bounds[1], n_samples)
-        
-        # Get terrain features for each location
-        features = []
-        for lat, lon in zip(lats, lons):
-            terrain = self.terrain_service.get_terrain_features(lat, lon)
-            features.append(terrain)
-        
-        # Create the DataFrame
-        data = pd.DataFrame({
-            'date': dates,
-            'latitude': lats,
-            'longitude': lons,
-            'elevation': [f['elevation'] for f in features],
-            'slope': [f['slope'] for f in features],
-            'forest_density': [f['forest_density'] for f in features],
-            'water_distance': [f['water_distance'] for f in features],
-            'temperature': np.random.normal(15, 10, n_samples),  # Mean 15°C, std 10°C
-            'precipitation': np.random.exponential(5, n_samples),  # Mean 5mm
-            'wind_speed': np.random.gamma(2, 2, n_samples),  # Shape 2, scale 2
-            'animal_present': np.random.binomial(1, 0.3, n_samples)  # 30% chance of presence
-        })
-        
-        # Save to CSV
-        output_file = self.data_dir / f'synthetic_data_{gmu_id}.csv'
-        data.to_csv(output_file, index=False)
-        print(f"Saved synthetic data to {output_file}")
-        
-        return data
+        written = 0
+        for chunk in self.iter_synthetic_chunks(gmu_id, n_samples, seed=seed):
+            # Add to the feature store; earlier samples are kept
+            written += self.feature_store.write(chunk, mode='append')
+        print(f"Saved {written} synthetic rows to {self.feature_store.root}")
+        return written
+        
+    def get_training_data(self, gmu_id: str, n_samples: int = 1000,
+                          columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Get at least n_samples stored training rows for a GMU
+        
+        Only the shortfall is generated; rows already in the feature store
+        are read back instead of being regenerated.
+        """
+        missing = n_samples - self.feature_store.count_rows(gmu_ids=[gmu_id])
+        if missing > 0:
+            self.generate_synthetic_data(gmu_id, missing)
+        return self.feature_store.read(gmu_ids=[gmu_id], columns=columns)
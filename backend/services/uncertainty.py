@@ -0,0 +1,90 @@
+import weakref
+from threading import Lock
+from typing import Optional, Tuple
+import numpy as np
+from sklearn.base import is_classifier
+from sklearn.ensemble import BaggingRegressor, ExtraTreesRegressor, RandomForestRegressor
+
+DEFAULT_CONFIDENCE = 0.8
+
+# Smallest |mean| a relative spread is divided by, so means near zero do
+# not divide by zero
+RELATIVE_SPREAD_FLOOR = 1e-6
+
+class _LeafValues:
+    """Leaf outputs of every tree in an ensemble, flattened for one lookup.
+
+    Tree t's node values live at offsets[t]:offsets[t + 1] in values, so
+    the outputs for a whole (rows x trees) matrix of leaf ids are
+    values[leaves + offsets[:-1]].
+    """
+
+    def __init__(self, trees):
+        node_values = [tree.tree_.value[:, 0, 0] for tree in trees]
+        self.offsets = np.cumsum([0] + [len(v) for v in node_values])
+        self.values = np.concatenate(node_values)
+
+    def lookup(self, leaves: np.ndarray) -> np.ndarray:
+        return self.values[leaves + self.offsets[:-1]]
+
+_leaf_cache = weakref.WeakKeyDictionary()
+_leaf_cache_lock = Lock()
+
+def _leaf_values(model) -> _LeafValues:
+    """Get the flattened leaf values of a fitted model, rebuilt after a refit"""
+    # A refit replaces estimators_; warm-start growth extends it in place
+    key = (model.estimators_, len(model.estimators_))
+    with _leaf_cache_lock:
+        entry = _leaf_cache.get(model)
+        if entry is None or entry[0] is not key[0] or entry[1] != key[1]:
+            entry = (*key, _LeafValues(model.estimators_))
+            _leaf_cache[model] = entry
+        return entry[2]
+
+def member_predictions(model, X) -> Optional[np.ndarray]:
+    """Predictions of each ensemble member for every row, shape (rows, members)
+
+    Forests use apply() to find every row's leaf in every tree and read the
+    leaf outputs with one indexing operation. Returns None for models
+    without independently fitted members, such as gradient boosting, whose
+    stages correct each other and so say nothing about uncertainty.
+    """
+    X = np.asarray(X)
+    if isinstance(model, (RandomForestRegressor, ExtraTreesRegressor)):
+        leaves = model.apply(X)
+        return _leaf_values(model).lookup(leaves)
+
+    if isinstance(model, BaggingRegressor):
+        return np.column_stack([
+            member.predict(X[:, features])
+            for member, features in zip(model.estimators_, model.estimators_features_)
+        ])
+
+    return None
+
+def prediction_spread(model, X) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """Mean and standard deviation of the ensemble members for every row"""
+    predictions = member_predictions(model, X)
+    if predictions is None:
+        return None
+    return predictions.mean(axis=1), predictions.std(axis=1)
+
+def ensemble_confidence(model, X, relative: bool = False,
+                        default: float = DEFAULT_CONFIDENCE) -> np.ndarray:
+    """Confidence in [0, 1] for every row of X
+
+    Classifiers use the top class probability. Regression ensembles use
+    the spread of their members: 1 - std, or 1 - std / |mean| when
+    relative is set. Other models get the default.
+    """
+    if is_classifier(model) and hasattr(model, 'predict_proba'):
+        return model.predict_proba(X).max(axis=1)
+
+    spread = prediction_spread(model, X)
+    if spread is None:
+        return np.full(len(X), default)
+
+    mean, std = spread
+    if relative:
+        std = std / np.maximum(np.abs(mean), RELATIVE_SPREAD_FLOOR)
+    return np.nan_to_num(np.clip(1.0 - std, 0.0, 1.0), nan=0.0)
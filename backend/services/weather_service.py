@@ -1,69 +1,91 @@
-import requests
 from datetime import datetime, timedelta
+from threading import Lock
 from typing import Dict, List, Optional
 import os
 from dotenv import load_dotenv
+from .http_client import CachedHTTPClient
 
 load_dotenv()
 
+# Forecasts don't change meaningfully within ~1 km, so nearby requests share
+# cache entries and in-flight fetches
+COORD_PRECISION = int(os.getenv('WEATHER_COORD_PRECISION', 2))
+
+_weather_client = None
+_weather_client_lock = Lock()
+
+def get_weather_client() -> CachedHTTPClient:
+    """Get the process-wide pooled, cached HTTP client for weather calls"""
+    global _weather_client
+    if _weather_client is None:
+        with _weather_client_lock:
+            if _weather_client is None:
+                _weather_client = CachedHTTPClient(
+                    timeout=float(os.getenv('WEATHER_TIMEOUT', 10)),
+                    ttl=float(os.getenv('WEATHER_CACHE_TTL', 600))
+                )
+    return _weather_client
+
 class WeatherService:
     def __init__(self):
         self.api_key = os.getenv('OPENWEATHER_API_KEY')
         self.base_url = 'https://api.openweathermap.org/data/3.0'
+        self.client = get_weather_client()
         
-    def get_current_weather(self, lat: float, lon: float) -> Dict:
-        """Get current weather conditions"""
-        url = f'{self.base_url}/weather'
+    def _get(self, endpoint: str, lat: float, lon: float, **extra) -> Optional[Dict]:
+        """Fetch an endpoint through the shared client, keyed by rounded location"""
+        lat = round(lat, COORD_PRECISION)
+        lon = round(lon, COORD_PRECISION)
         params = {
             'lat': lat,
             'lon': lon,
             'appid': self.api_key,
-            'units': 'imperial'
+            'units': 'imperial',
+            **extra
         }
+        key = (endpoint, lat, lon, tuple(sorted(extra.items())))
+        return self.client.get_json(key, f'{self.base_url}/{endpoint}', params)
         
-        response = requests.get(url, params=params)
-        if response.status_code != 200:
+    def get_current_weather(self, lat: float, lon: float) -> Dict:
+        """Get current weather conditions"""
+        data = self._get('weather', lat, lon)
+        if data is None:
             return self._get_default_weather()
             
-        data = response.json()
         return self._format_current_weather(data)
         
     def get_forecast(self, lat: float, lon: float, days: int = 5) -> List[Dict]:
         """Get weather forecast"""
-        url = f'{self.base_url}/forecast'
-        params = {
-            'lat': lat,
-            'lon': lon,
-            'appid': self.api_key,
-            'units': 'imperial'
-        }
-        
-        response = requests.get(url, params=params)
-        if response.status_code != 200:
+        data = self._get('forecast', lat, lon)
+        if data is None:
             return [self._get_default_weather() for _ in range(days)]
             
-        data = response.json()
         return self._format_forecast(data, days)
         
+    def get_forecast_periods(self, lat: float, lon: float) -> List[Dict]:
+        """Get the raw 3-hourly forecast periods, formatted like current weather
+        
+        Shares the cached forecast response with get_forecast, so calling both
+        for a location costs one upstream request.
+        """
+        data = self._get('forecast', lat, lon)
+        if data is None:
+            return [self._get_default_weather()]
+            
+        return [self._format_forecast_period(item) for item in data.get('list', [])]
+        
     def get_historical_weather(self, lat: float, lon: float, 
                              start_date: datetime,
                              end_date: datetime) -> List[Dict]:
         """Get historical weather data"""
-        url = f'{self.base_url}/history'
-        params = {
-            'lat': lat,
-            'lon': lon,
-            'appid': self.api_key,
-            'units': 'imperial',
-            'start': int(start_date.timestamp()),
-            'end': int(end_date.timestamp())
-        }
-        
-        response = requests.get(url, params=params)
-        if response.status_code != 200:
+        data = self._get(
+            'history', lat, lon,
+            start=int(start_date.timestamp()),
+            end=int(end_date.timestamp())
+        )
+        if data is None:
             return []
             
-        data = response.json()
         return self._format_historical_weather(data)
         
     def analyze_hunting_conditions(self, weather_data: Dict) -> Dict:
@@ -126,6 +148,15 @@ class WeatherService:
             'timestamp': datetime.fromtimestamp(data.get('dt', 0))
         }
         
+    def _format_forecast_period(self, item: Dict) -> Dict:
+        """Format one 3-hourly forecast period"""
+        period = self._format_current_weather(item)
+        period['precipitation'] = (
+            item.get('rain', {}).get('3h', 0) +
+            item.get('snow', {}).get('3h', 0)
+        )
+        return period
+        
     def _format_forecast(self, data: Dict, days: int) -> List[Dict]:
         """Format forecast data"""
         forecast = []